@@ -0,0 +1,205 @@
+import pandas as pd
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Dict, List, Union
+
+
+# Methods accepted by allocate
+ALLOCATION_METHODS = ('greedy', 'rounding')
+
+# Number of the most underweight assets tried in one step of the greedy method before giving up, as in pypfopt
+_GREEDY_CANDIDATES = 10
+
+
+def latest_prices(prices: pd.DataFrame) -> pd.Series:
+    """
+    Returns the most recent price of every asset (the last one that is not missing), like pypfopt's
+    get_latest_prices but independent of the order of the dates.
+    """
+    return prices.sort_index().ffill().iloc[-1]
+
+
+@dataclass
+class AllocationResult:
+    """
+    Integer share allocations of several weight sets for several budgets.
+
+    Attributes:
+        shares (np.ndarray): Number of shares, array (n_weight_sets x n_budgets x n_assets).
+        leftover (np.ndarray): Cash left after buying the shares, array (n_weight_sets x n_budgets).
+        weights (pd.DataFrame): Target weights, one row per weight set.
+        prices (pd.Series): Prices the shares were bought at.
+        budgets (np.ndarray): Total portfolio values.
+    """
+    shares: np.ndarray
+    leftover: np.ndarray
+    weights: pd.DataFrame
+    prices: pd.Series
+    budgets: np.ndarray
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self.weights.columns)
+
+    def allocation(self, weight_set, budget) -> Dict[str, int]:
+        """
+        Returns the shares of one weight set for one budget as a dictionary ticker -> shares, without zero positions
+        (the format of DiscreteAllocation).
+        """
+        i = self.weights.index.get_loc(weight_set)
+        j = int(np.flatnonzero(self.budgets == budget)[0])
+        return {ticker: int(n) for ticker, n in zip(self.tickers, self.shares[i, j]) if n}
+
+    def achieved_weights(self) -> np.ndarray:
+        """
+        Weights of the bought shares in their total value, array (n_weight_sets x n_budgets x n_assets).
+        """
+        values = self.shares * self.prices.to_numpy()
+        totals = values.sum(axis=2, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(totals > 0, values / totals, 0.0)
+
+    def rmse(self) -> np.ndarray:
+        """
+        Root mean square error between the achieved and the target weights (over assets with a non-zero target,
+        like DiscreteAllocation's error analysis), array (n_weight_sets x n_budgets).
+        """
+        target = self.weights.to_numpy()[:, None, :]
+        held = target != 0
+        errors = np.where(held, self.achieved_weights() - target, 0.0)
+        return np.sqrt((errors ** 2).sum(axis=2) / np.maximum(held.sum(axis=2), 1))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the shares as a data frame indexed by (weight set, budget) with one column per ticker and the
+        leftover cash in the 'Leftover' column.
+        """
+        index = pd.MultiIndex.from_product([self.weights.index, self.budgets], names=['Weights', 'Budget'])
+        frame = pd.DataFrame(self.shares.reshape(-1, self.shares.shape[2]), index=index, columns=self.tickers)
+        frame['Leftover'] = self.leftover.ravel()
+        return frame
+
+
+def _greedy(weights: np.ndarray, prices: np.ndarray, shares: np.ndarray, funds: np.ndarray):
+    # Second round of pypfopt's greedy_portfolio for all rows at once: every active row buys one share of the most
+    # underweight asset it can afford among the _GREEDY_CANDIDATES most underweight ones, until nothing fits
+    active = funds > 0
+    rows = np.arange(len(weights))
+    while active.any():
+        r = rows[active]
+        held = shares[r] * prices[r]
+        totals = held.sum(axis=1, keepdims=True)
+        current = np.divide(held, totals, out=np.zeros_like(held), where=totals > 0)
+        deficit = weights[r] - current
+
+        # Assets are ranked by deficit, ties go to the asset with the larger weight (stable sort of the columns,
+        # which are ordered by descending weight within every row)
+        ranking = np.argsort(-deficit, axis=1, kind='stable')[:, :_GREEDY_CANDIDATES]
+        candidate_prices = np.take_along_axis(prices[r], ranking, axis=1)
+        affordable = (candidate_prices <= funds[r, None]) & (np.take_along_axis(deficit, ranking, axis=1) > 0)
+
+        can_buy = affordable.any(axis=1)
+        first = affordable.argmax(axis=1)[can_buy]
+        bought = r[can_buy]
+        shares[bought, ranking[can_buy, first]] += 1
+        funds[bought] -= candidate_prices[can_buy, first]
+
+        active[r[~can_buy]] = False
+        active[bought] = funds[bought] > 0
+
+
+def _rounding(weights: np.ndarray, prices: np.ndarray, shares: np.ndarray, funds: np.ndarray, values: np.ndarray):
+    # One extra share for the assets with the largest fractional parts of their ideal share counts, in that order
+    # while the cash lasts - a single vectorized pass instead of one purchase per step
+    remainder = weights * values[:, None] / prices - shares
+    order = np.argsort(-remainder, axis=1, kind='stable')
+    ordered_prices = np.take_along_axis(prices, order, axis=1)
+    fits = (np.cumsum(ordered_prices, axis=1) <= funds[:, None]) & (np.take_along_axis(remainder, order, axis=1) > 0)
+    np.put_along_axis(shares, order, np.take_along_axis(shares, order, axis=1) + fits, axis=1)
+    funds -= (fits * ordered_prices).sum(axis=1)
+
+
+def allocate(
+        weights: Union[pd.DataFrame, pd.Series, Dict[str, Dict[str, float]]],
+        prices: pd.Series,
+        budgets,
+        method: str = 'greedy'
+        ) -> AllocationResult:
+    """
+    Converts continuous weights into integer numbers of shares for many weight sets and budgets at once.
+
+    'greedy' gives the same shares as pypfopt's DiscreteAllocation(...).greedy_portfolio() for long-only weights:
+    the floor of every ideal share count is bought first, then one share at a time of the most underweight asset.
+    All (weight set, budget) pairs are processed together, so the number of Python steps is the largest number
+    of extra shares of a single pair instead of the sum over all of them. 'rounding' replaces the share-by-share
+    loop with one pass distributing the leftover cash by the fractional parts of the ideal share counts, which is
+    much faster and usually close in quality (see benchmarks/allocation.py).
+
+    Parameters:
+    -----------
+    weights : pandas.DataFrame, pandas.Series or dict
+        Weight sets, one row per set (e.g. per optimization method) and one column per ticker, a single set as a
+        Series, or a dictionary name -> (ticker -> weight) like the outputs of PortfolioOptimization.optimize.
+
+    prices : pandas.Series
+        Latest price of every ticker (see latest_prices).
+
+    budgets : float or list of float
+        Total portfolio values.
+
+    method : str
+        One of ALLOCATION_METHODS: 'greedy' or 'rounding'.
+
+    Returns:
+    --------
+    AllocationResult
+        Shares and leftover cash for every weight set and budget.
+    """
+    if method not in ALLOCATION_METHODS:
+        raise ValueError(f"Unknown method: {method}, expected one of {ALLOCATION_METHODS}")
+    if isinstance(weights, pd.Series):
+        weights = weights.to_frame().T
+    elif isinstance(weights, dict):
+        weights = pd.DataFrame.from_dict(weights, orient='index')
+    weights = weights.fillna(0.0).astype(np.float64)
+    if (weights.to_numpy() < 0).any():
+        raise ValueError("Only long weights can be allocated in batch, use DiscreteAllocation for short positions")
+    missing = [ticker for ticker in weights.columns if ticker not in prices.index or np.isnan(prices[ticker])]
+    if missing:
+        raise ValueError(f"No prices for: {missing}")
+    budgets = np.atleast_1d(np.asarray(budgets, dtype=np.float64))
+    if (budgets <= 0).any():
+        raise ValueError("Budgets must be greater than zero")
+
+    tickers = list(weights.columns)
+    prices = prices[tickers].astype(np.float64)
+    W, p = weights.to_numpy(), prices.to_numpy()
+    n_sets, n_budgets, n_assets = len(W), len(budgets), len(tickers)
+
+    # Every (weight set, budget) pair is a row, columns are sorted by descending weight of the row's set
+    order = np.argsort(-W, axis=1, kind='stable')
+    row_order = np.repeat(order, n_budgets, axis=0)
+    row_weights = np.take_along_axis(np.repeat(W, n_budgets, axis=0), row_order, axis=1)
+    values = np.tile(budgets, n_sets)
+
+    # First round: the floor of every ideal share count, it can never exceed the budget
+    row_prices = p[row_order]
+    shares = np.floor(row_weights * values[:, None] / row_prices).astype(np.int64)
+    funds = values - (shares * row_prices).sum(axis=1)
+
+    if method == 'greedy':
+        _greedy(row_weights, row_prices, shares, funds)
+    else:
+        _rounding(row_weights, row_prices, shares, funds, values)
+
+    # Back to the original order of the tickers
+    result = np.empty_like(shares)
+    np.put_along_axis(result, row_order, shares, axis=1)
+    return AllocationResult(
+        shares=result.reshape(n_sets, n_budgets, n_assets),
+        leftover=funds.reshape(n_sets, n_budgets),
+        weights=weights,
+        prices=prices,
+        budgets=budgets
+    )
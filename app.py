@@ -1,12 +1,23 @@
+from functools import lru_cache
+
 from shiny import App, render, ui, reactive
 
-from skfolio.datasets import load_ftse100_dataset
-from skfolio.preprocessing import prices_to_returns
+from grid_view import downsample_prices, page_of
+from price_service import PriceService
+from price_snapshot import snapshot_prices
+from yf_data_gathering import GROUPS_OF_TICKERS, PERIODS
+
 
-from yf_data_gathering import PERIODS, gather_data
+@lru_cache(maxsize=None)
+def ftse100_returns():
+    # Example dataset, loaded on first use instead of on import (skfolio is slow to import)
+    from skfolio.datasets import load_ftse100_dataset
+    from skfolio.preprocessing import prices_to_returns
 
+    return prices_to_returns(load_ftse100_dataset())
 
-prices = prices_to_returns(load_ftse100_dataset())
+# One service for all sessions, so that users asking for the same tickers share downloads and cached frames
+price_service = PriceService()
 
 app_ui = ui.page_fluid(
     ui.tags.style("""
@@ -54,6 +65,29 @@ app_ui = ui.page_fluid(
                             ui.output_text("tickers_preview")
                         ),
                         ui.card(
+                            ui.layout_columns(
+                                ui.input_select(
+                                    id="grid_resample",
+                                    label="Overview",
+                                    choices={"": "Daily", "W": "Weekly", "M": "Monthly", "Q": "Quarterly"}
+                                ),
+                                ui.input_radio_buttons(
+                                    id="grid_aggregation",
+                                    label="Bucket value",
+                                    choices={"last": "Last", "ohlc": "OHLC"},
+                                    selected="last"
+                                ),
+                                ui.input_select(
+                                    id="grid_page_size",
+                                    label="Rows",
+                                    choices=["25", "50", "100"],
+                                    selected="50"
+                                ),
+                                ui.input_numeric("grid_page", "Page", value=1, min=1),
+                                col_widths=(3, 3, 3, 3)
+                            ),
+                            ui.input_selectize("grid_columns", "Visible tickers", choices=[], multiple=True),
+                            ui.output_text("grid_position"),
                             ui.output_data_frame("portfolio_prices")
                         ),
                         col_widths=(4, 3, 5),
@@ -88,71 +122,103 @@ def server(input, output, session):
         else:
             return ui.input_date_range('date_range', "Date range", start="2020-01-01")
         
-    @render.text
-    def tickers_preview():
+    @reactive.calc
+    def tickers():
+        # Parsing the tickers once, every output depending on them reuses the result
         mode = input.ticker_mode()
         
         if mode == "file":
             files = input.tickers_file()
             if not files:
-                return "No file."
+                return []
             filepath = files[0]["datapath"]
         
             with open(filepath, "r", encoding="utf-8") as f:
                 lines = f.read().splitlines()
-            tickers = [f"{line.strip()}" for line in lines if line.strip()]
-            return f"Tickers from file: \n {', '.join(tickers)}"
+            return [line.strip() for line in lines if line.strip()]
         
         elif mode == "manual":
             txt = input.tickers_manual()
-            tickers = [x.strip() for x in txt.split(",") if x.strip()]
-            return f"Manually inserted tickers: \n {', '.join(tickers)}"
+            return [x.strip() for x in txt.split(",") if x.strip()]
         
         elif mode == "default":
-            tickers = input.tickers_default()
-            return f"Chosen group of tickers: {tickers}"
-        
-    @render.DataGrid
-    def portfolio_prices():
-        mode = input.ticker_mode()
+            return GROUPS_OF_TICKERS.get(input.tickers_default(), [])
+        return []
+
+    @reactive.calc
+    def dates():
         if input.date_or_period() == 'period':
-            if mode == "file":
-                files = input.tickers_file()
-                if not files:
-                    return "No file."
-                filepath = files[0]["datapath"]
-            
-                with open(filepath, "r", encoding="utf-8") as f:
-                    lines = f.read().splitlines()
-                tickers = [f"{line.strip()}" for line in lines if line.strip()]
-                df = gather_data(tickers= tickers, period= input.date_or_period())
-                return render.DataGrid(df) 
-            elif mode == "manual":
-                txt = input.tickers_manual()
-                tickers = [x.strip() for x in txt.split(",") if x.strip()]
-                df = gather_data(tickers= tickers, period= input.date_or_period())
-                return render.DataGrid(df) 
-            elif mode == "default":
-                return
-        else:
-            if mode == "file":
-                files = input.tickers_file()
-                if not files:
-                    return "No file."
-                filepath = files[0]["datapath"]
-            
-                with open(filepath, "r", encoding="utf-8") as f:
-                    lines = f.read().splitlines()
-                tickers = [line.strip() for line in lines if line.strip()]
-                df = gather_data(tickers= tickers, start_date= input.date_or_period()[0], end_date=input.date_or_period()[1])
-                return render.DataGrid(df) 
-            elif mode == "manual":
-                txt = input.tickers_manual()
-                tickers = [x.strip() for x in txt.split(",") if x.strip()]
-                df = gather_data(tickers= tickers, start_date= input.date_or_period()[0], end_date=input.date_or_period()[1])
-                return render.DataGrid(df)  
-            elif mode == "default":
-                return
+            return {'period': input.period_selection()}
+        start_date, end_date = input.date_range()
+        return {'start_date': str(start_date), 'end_date': str(end_date)}
+
+    @reactive.calc
+    async def prices():
+        chosen_tickers = tickers()
+        if not chosen_tickers:
+            return None
+        if input.ticker_mode() == "default":
+            # Predefined groups are served from the prebuilt snapshot (see price_snapshot.py) when it covers the dates
+            snapshot = snapshot_prices(input.tickers_default(), **dates())
+            if snapshot is not None:
+                return snapshot
+        # Download runs in the service's thread pool, the event loop keeps serving other sessions meanwhile
+        with ui.Progress() as progress:
+            progress.set(message="Downloading prices", detail=f"{len(chosen_tickers)} tickers")
+            return await price_service.get(chosen_tickers, **dates())
+
+    @render.text
+    def tickers_preview():
+        mode = input.ticker_mode()
+        
+        if mode == "file":
+            if not input.tickers_file():
+                return "No file."
+            return f"Tickers from file: \n {', '.join(tickers())}"
+        
+        elif mode == "manual":
+            return f"Manually inserted tickers: \n {', '.join(tickers())}"
+        
+        elif mode == "default":
+            return f"Chosen group of tickers: {input.tickers_default()}"
+        
+    @reactive.effect
+    async def update_visible_columns():
+        # Showing the first tickers by default, the grid never sends hundreds of columns at once
+        df = await prices()
+        tickers_in_data = [] if df is None else df.columns.to_list()
+        ui.update_selectize("grid_columns", choices=tickers_in_data, selected=tickers_in_data[:10])
+
+    @reactive.calc
+    async def overview():
+        df = await prices()
+        if df is None:
+            return None
+        return downsample_prices(df, input.grid_resample(), input.grid_aggregation())
+
+    @reactive.calc
+    async def grid_page():
+        df = await overview()
+        if df is None:
+            return None, 0
+        # With nothing selected the first tickers are shown, not all of them
+        columns = list(input.grid_columns()) or df.columns.get_level_values(0).unique()[:10].to_list()
+        return page_of(df, page=input.grid_page() or 1, page_size=int(input.grid_page_size()), columns=columns)
+
+    @render.text
+    async def grid_position():
+        page, n_pages = await grid_page()
+        if page is None:
+            return ""
+        return f"Page {min(max(1, input.grid_page() or 1), n_pages)} of {n_pages}"
+
+    @render.data_frame
+    async def portfolio_prices():
+        page, _ = await grid_page()
+        if page is None:
+            return None
+        # Only the visible window of rows and columns is serialized to the browser
+        return render.DataGrid(page.reset_index())
 
 
 
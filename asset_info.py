@@ -0,0 +1,182 @@
+import time
+import threading
+
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import instrumentation
+
+
+def yahoo_info(ticker: str) -> dict:
+    """
+    Default fetcher, returns the full info dictionary of a ticker from Yahoo Finance.
+    """
+    import yfinance as yf  # imported on first use, it is slow to import
+
+    return yf.Ticker(ticker).info or {}
+
+
+@dataclass
+class AssetInfoResult:
+    """
+    Outcome of fetch_asset_info.
+
+    Attributes:
+        info (pd.DataFrame): One row per ticker which was fetched or found in the cache, columns are 'Ticker' and the fields.
+        failures (Dict[str, str]): Tickers which could not be fetched, mapped to the last error message.
+        cached (List[str]): Tickers served from the cache without a request.
+    """
+    info: pd.DataFrame
+    failures: Dict[str, str] = field(default_factory=dict)
+    cached: List[str] = field(default_factory=list)
+
+
+class AssetInfoCache:
+    """
+    In-memory cache of asset information with a time to live. Fields like sector, country or number of employees
+    rarely change, so there is no need to ask Yahoo for them on every Portfolio construction.
+
+    Parameters:
+    -----------
+    ttl : float
+        Time (in seconds) after which an entry is considered stale. One week by default.
+    """
+    def __init__(self, ttl: float = 7 * 24 * 3600):
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str, fields: List[str]) -> Optional[dict]:
+        """
+        Returns cached values of the fields for the ticker, or None if the entry is missing, stale or incomplete.
+        """
+        with self._lock:
+            entry = self._entries.get(ticker)
+        if entry is None:
+            return None
+        stored_at, values = entry
+        if time.monotonic() - stored_at > self.ttl or not all(name in values for name in fields):
+            return None
+        return {name: values[name] for name in fields}
+
+    def put(self, ticker: str, values: dict):
+        """
+        Stores values of the fields for the ticker, extending the already cached ones.
+        """
+        with self._lock:
+            previous = self._entries.get(ticker, (0.0, {}))[1]
+            self._entries[ticker] = (time.monotonic(), {**previous, **values})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+DEFAULT_INFO_CACHE = AssetInfoCache()
+
+
+@instrumentation.timed('fetch_asset_info')
+def fetch_asset_info(
+        tickers: List[str],
+        fields: List[str],
+        fetcher: Callable[[str], dict] = yahoo_info,
+        cache: Optional[AssetInfoCache] = DEFAULT_INFO_CACHE,
+        max_workers: int = 8,
+        timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.5
+        ) -> AssetInfoResult:
+    """
+    Fetches the requested fields for many tickers concurrently.
+
+    Tickers found in the cache are not requested at all. The rest are fetched by a bounded pool of threads; every
+    attempt has its own timeout and failed attempts are retried with exponential backoff (backoff, 2 * backoff, ...).
+    Tickers which still fail are reported in the result instead of stopping the whole run.
+
+    Parameters:
+    -----------
+    tickers : list
+        Tickers to fetch the information for.
+
+    fields : list
+        Fields (strings) to keep from the info dictionary, e.g. RELEVANT_INFO. Missing fields are set to None.
+
+    fetcher : callable
+        Function returning the info dictionary for a ticker. Yahoo Finance by default, it can be replaced with a
+        stub returning canned dictionaries.
+
+    cache : AssetInfoCache, optional
+        Cache to read from and write to. Pass None to always fetch.
+
+    max_workers : int
+        Maximal number of requests running at the same time.
+
+    timeout : float
+        Time limit (in seconds) of a single attempt.
+
+    retries : int
+        Number of additional attempts after a failed one.
+
+    backoff : float
+        Delay (in seconds) before the first retry, doubled for every next one.
+
+    Returns:
+    --------
+    AssetInfoResult
+        Information table, failures and the list of tickers served from the cache.
+    """
+    rows: Dict[str, dict] = {}
+    failures: Dict[str, str] = {}
+    cached = []
+
+    to_fetch = []
+    for ticker in dict.fromkeys(tickers):
+        values = cache.get(ticker, fields) if cache is not None else None
+        if values is None:
+            to_fetch.append(ticker)
+        else:
+            rows[ticker] = values
+            cached.append(ticker)
+    instrumentation.cache_access('asset_info', hits=len(cached), misses=len(to_fetch))
+
+    if to_fetch:
+        # Attempts run in their own pool, so that a hanging request can be abandoned after the timeout.
+        # It is bigger than the coordinating pool to leave room for abandoned requests which are still running.
+        attempts_pool = ThreadPoolExecutor(max_workers=max_workers * (retries + 1))
+
+        def fetch_one(ticker):
+            error = None
+            for attempt in range(retries + 1):
+                if attempt:
+                    time.sleep(backoff * 2 ** (attempt - 1))
+                try:
+                    info = attempts_pool.submit(fetcher, ticker).result(timeout=timeout)
+                    return {name: info.get(name, None) for name in fields}, None
+                except FutureTimeoutError:
+                    error = f"Timed out after {timeout} s"
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            return None, error
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for ticker, (values, error) in zip(to_fetch, pool.map(fetch_one, to_fetch)):
+                    if values is None:
+                        failures[ticker] = error
+                        continue
+                    rows[ticker] = values
+                    if cache is not None:
+                        cache.put(ticker, values)
+        finally:
+            attempts_pool.shutdown(wait=False)
+        instrumentation.count('asset_info.failures', len(failures))
+
+    # Keeping the order of the input tickers
+    info = pd.DataFrame(
+        [[ticker] + [rows[ticker][name] for name in fields] for ticker in dict.fromkeys(tickers) if ticker in rows],
+        columns=['Ticker'] + list(fields)
+    )
+    return AssetInfoResult(info=info, failures=failures, cached=cached)
@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Union
+
+from data_gathering import Portfolio
+from optimization import solve_weights
+
+
+class RollingMoments:
+    """
+    Mean and covariance matrix of a window of returns, updated incrementally.
+
+    The window is represented by the running sum of rows and the running sum of their outer products, so adding
+    or removing k rows costs O(k * n_assets^2) no matter how long the window is.
+
+    Parameters:
+    -----------
+    n_assets : int
+        Number of columns of the returns.
+    """
+    def __init__(self, n_assets: int):
+        self.n = 0
+        self.sum = np.zeros(n_assets)
+        self.sum_outer = np.zeros((n_assets, n_assets))
+
+    def add(self, rows: np.ndarray):
+        self.n += len(rows)
+        self.sum += rows.sum(axis=0)
+        self.sum_outer += rows.T @ rows
+
+    def remove(self, rows: np.ndarray):
+        self.n -= len(rows)
+        self.sum -= rows.sum(axis=0)
+        self.sum_outer -= rows.T @ rows
+
+    def mean(self) -> np.ndarray:
+        return self.sum / self.n
+
+    def covariance(self) -> np.ndarray:
+        mean = self.mean()
+        return (self.sum_outer - self.n * np.outer(mean, mean)) / (self.n - 1)
+
+
+@dataclass
+class BacktestResult:
+    """
+    Outcome of walk_forward_backtest.
+
+    Attributes:
+        returns (pd.Series): Realized daily returns of the portfolio.
+        weights (pd.DataFrame): Target weights set at every rebalance date.
+        turnover (pd.Series): One-way turnover at every rebalance after the first one (half of the sum of absolute
+                              changes between the drifted and the new weights).
+        failures (Dict[pd.Timestamp, str]): Rebalance dates where the optimizer failed and the previous weights were kept.
+    """
+    returns: pd.Series
+    weights: pd.DataFrame
+    turnover: pd.Series
+    failures: Dict[pd.Timestamp, str] = field(default_factory=dict)
+
+    @property
+    def wealth(self) -> pd.Series:
+        """
+        Value of the portfolio over time, starting from 1.
+        """
+        return (1 + self.returns).cumprod()
+
+    @property
+    def drawdown(self) -> pd.Series:
+        """
+        Relative distance of the portfolio value from its running maximum.
+        """
+        wealth = self.wealth
+        return wealth / wealth.cummax() - 1
+
+    @property
+    def max_drawdown(self) -> float:
+        return float(self.drawdown.min())
+
+    def summary(self, frequency: int = 252, risk_free_rate: float = 0.0) -> dict:
+        """
+        Returns annualized return, volatility, Sharpe ratio, maximal drawdown and average turnover.
+        """
+        annual_return = (1 + self.returns).prod() ** (frequency / len(self.returns)) - 1
+        annual_volatility = self.returns.std() * np.sqrt(frequency)
+        return {
+            'annual_return': float(annual_return),
+            'annual_volatility': float(annual_volatility),
+            'sharpe': float((annual_return - risk_free_rate) / annual_volatility),
+            'max_drawdown': self.max_drawdown,
+            'average_turnover': float(self.turnover.mean()) if len(self.turnover) else 0.0
+        }
+
+
+def _rebalance_positions(index: pd.DatetimeIndex, start: int, rebalance: Union[int, str]) -> List[int]:
+    # Positions (rows of returns) at which new weights are set, the first one right after the first full window
+    if isinstance(rebalance, int):
+        return list(range(start, len(index), rebalance))
+    periods = index.to_period(rebalance)
+    first_days = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    return [start] + [int(i) for i in first_days if i > start]
+
+
+def _solve_window(task: tuple):
+    mu, S, window_returns, method, kwargs = task
+    try:
+        weights, _ = solve_weights(mu, S, method, returns=window_returns, **kwargs)
+        return weights, None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def walk_forward_backtest(
+        data: Union[Portfolio, pd.DataFrame],
+        method: str = 'MV',
+        window: int = 252,
+        rebalance: Union[int, str] = 'M',
+        expanding: bool = False,
+        shrinkage: float = 0.0,
+        frequency: int = 252,
+        n_jobs: int = 1,
+        **kwargs
+        ) -> BacktestResult:
+    """
+    Walk-forward (out of sample) evaluation of an optimization method.
+
+    At every rebalance date the expected returns and covariance matrix are estimated on the window of returns
+    before that date, weights are solved with optimization.solve_weights and held (drifting with prices) until the
+    next rebalance. Window estimates are updated incrementally by RollingMoments instead of being recomputed.
+    Windows are independent once estimated, so their solves can be run in a process pool.
+
+    Parameters:
+    -----------
+    data : Portfolio or pandas.DataFrame
+        Portfolio whose historical_data is used, or a price matrix (dates x tickers). Dates with a missing price
+        of any ticker are skipped.
+
+    method : str
+        Optimization method, one of optimization.METHODS.
+
+    window : int
+        Length of the estimation window in trading days (the minimal length if expanding).
+
+    rebalance : int or str
+        Number of trading days between rebalances, or a pandas period alias ('W', 'M', 'Q') - rebalancing on the
+        first trading day of every period.
+
+    expanding : bool
+        Whether the window grows from the beginning of the data instead of rolling.
+
+    shrinkage : float
+        Intensity (0-1) of shrinking the sample covariance towards a scaled identity matrix.
+
+    frequency : int
+        Number of trading days in a year, used for annualizing the estimates.
+
+    n_jobs : int
+        Number of processes solving the windows.
+
+    kwargs
+        Passed to solve_weights, e.g. risk_free_rate or target_volatility.
+
+    Returns:
+    --------
+    BacktestResult
+        Realized returns, weights, turnover and failures.
+    """
+    prices = data.historical_data if isinstance(data, Portfolio) else data
+    returns = prices.sort_index().pct_change().iloc[1:].dropna(how='any')
+    tickers = list(returns.columns)
+    values = returns.to_numpy(dtype=np.float64)
+    if len(values) <= window:
+        raise ValueError(f"Not enough data: {len(values)} days of returns for a window of {window} days")
+
+    positions = _rebalance_positions(returns.index, window, rebalance)
+
+    # Estimating all windows sequentially, every step only adds the new rows and removes the dropped ones
+    moments = RollingMoments(len(tickers))
+    tasks = []
+    added, removed = 0, 0
+    for position in positions:
+        moments.add(values[added:position])
+        added = position
+        if not expanding:
+            moments.remove(values[removed:position - window])
+            removed = position - window
+
+        S = moments.covariance() * frequency
+        if shrinkage:
+            S = (1 - shrinkage) * S + shrinkage * np.trace(S) / len(tickers) * np.eye(len(tickers))
+        window_returns = returns.iloc[removed:position] if method == 'HRP' else None
+        tasks.append((
+            pd.Series(moments.mean() * frequency, index=tickers),
+            pd.DataFrame(S, index=tickers, columns=tickers),
+            window_returns, method, kwargs
+        ))
+
+    if n_jobs == 1:
+        solutions = list(map(_solve_window, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            solutions = list(executor.map(_solve_window, tasks, chunksize=max(1, len(tasks) // (4 * n_jobs))))
+
+    # Holding every set of weights until the next rebalance, weights drift with the prices in between
+    portfolio_returns = np.empty(len(values) - positions[0])
+    target_weights, turnover, failures = [], [], {}
+    current = np.full(len(tickers), 1 / len(tickers))  # equal weights if the very first solve fails
+    drifted = None
+    for i, (position, (solution, error)) in enumerate(zip(positions, solutions)):
+        if solution is None:
+            failures[returns.index[position]] = error
+            # Keeping the previous weights, as they are after drifting
+            current = drifted if drifted is not None else current
+        else:
+            current = np.array([solution.get(ticker, 0.0) for ticker in tickers])
+        if drifted is not None:
+            turnover.append(0.5 * np.abs(current - drifted).sum())
+        target_weights.append(current)
+
+        end = positions[i + 1] if i + 1 < len(positions) else len(values)
+        growth = np.cumprod(1 + values[position:end], axis=0)
+        value = growth @ current
+        portfolio_returns[position - positions[0]:end - positions[0]] = value / np.r_[1.0, value[:-1]] - 1
+        drifted = current * growth[-1] / value[-1]
+
+    dates = returns.index[positions]
+    return BacktestResult(
+        returns=pd.Series(portfolio_returns, index=returns.index[positions[0]:], name='Return'),
+        weights=pd.DataFrame(target_weights, index=dates, columns=tickers),
+        turnover=pd.Series(turnover, index=dates[1:], name='Turnover'),
+        failures=failures
+    )
@@ -0,0 +1,70 @@
+"""
+Compares discrete allocation of many weight sets and budgets: pypfopt's DiscreteAllocation.greedy_portfolio called
+once per pair, the batched greedy method of allocation.allocate (which should give the same shares) and its
+rounding method. Reports time, mean tracking error (RMSE of weights) and mean leftover cash.
+
+Usage:
+    python -m benchmarks.allocation --assets 50 --weight-sets 4 --budgets 25
+"""
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from allocation import allocate
+
+
+def random_problem(n_assets: int, n_weight_sets: int, n_budgets: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    tickers = [f'SYN{i:04d}' for i in range(n_assets)]
+    prices = pd.Series(np.exp(rng.uniform(np.log(5), np.log(2000), n_assets)).round(2), index=tickers)
+    # Optimizers usually leave some assets out, about half of the weights are zero
+    raw = rng.dirichlet(np.full(n_assets, 0.5), n_weight_sets) * (rng.random((n_weight_sets, n_assets)) < 0.5)
+    weights = pd.DataFrame(raw / raw.sum(axis=1, keepdims=True), index=[f'set{i}' for i in range(n_weight_sets)],
+                           columns=tickers).round(5)
+    budgets = np.geomspace(5_000, 1_000_000, n_budgets).round(2)
+    return weights, prices, budgets
+
+
+def run(n_assets: int, n_weight_sets: int, n_budgets: int, seed: int = 0) -> dict:
+    from pypfopt.discrete_allocation import DiscreteAllocation
+
+    weights, prices, budgets = random_problem(n_assets, n_weight_sets, n_budgets, seed)
+    report = {}
+
+    start = time.perf_counter()
+    reference = np.zeros((n_weight_sets, n_budgets, n_assets), dtype=np.int64)
+    for i, (_, row) in enumerate(weights.iterrows()):
+        for j, budget in enumerate(budgets):
+            shares, _ = DiscreteAllocation(row.to_dict(), prices, total_portfolio_value=budget).greedy_portfolio()
+            reference[i, j] = [shares.get(ticker, 0) for ticker in weights.columns]
+    report['pypfopt'] = {'seconds': time.perf_counter() - start}
+
+    for method in ('greedy', 'rounding'):
+        start = time.perf_counter()
+        result = allocate(weights, prices, budgets, method=method)
+        report[method] = {
+            'seconds': time.perf_counter() - start,
+            'rmse': float(result.rmse().mean()),
+            'leftover': float((result.leftover / budgets).mean()),
+            'same_as_pypfopt': float((result.shares == reference).all(axis=2).mean())
+        }
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--assets', type=int, default=50)
+    parser.add_argument('--weight-sets', type=int, default=4)
+    parser.add_argument('--budgets', type=int, default=25)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    report = run(args.assets, args.weight_sets, args.budgets, args.seed)
+    print(f"{args.weight_sets} weight sets x {args.budgets} budgets, {args.assets} assets")
+    print(f"pypfopt greedy (loop): {report['pypfopt']['seconds']:8.3f} s")
+    for method in ('greedy', 'rounding'):
+        stats = report[method]
+        print(f"{method + ' (batched):':22} {stats['seconds']:8.3f} s  rmse {stats['rmse']:.5f}  "
+              f"leftover {100 * stats['leftover']:.3f} %  same as pypfopt {100 * stats['same_as_pypfopt']:.0f} %")
@@ -0,0 +1,54 @@
+"""
+Compares the memory footprint and build time of Portfolio.daily_info with the compact layout of
+Portfolio.get_compact_daily_info on synthetic data.
+
+Usage:
+    python -m benchmarks.daily_info_memory --tickers 500 --years 6
+"""
+import time
+import argparse
+import tempfile
+
+from asset_info import fetch_asset_info
+from data_cache import PriceCache
+from data_gathering import Portfolio, RELEVANT_INFO
+from benchmarks.synthetic import SyntheticSource, canned_info
+
+
+def run(n_tickers: int, years: float) -> dict:
+    source = SyntheticSource(n_tickers, years)
+    # Filling the asset info cache, so that the portfolio never asks Yahoo
+    fetch_asset_info(source.tickers, RELEVANT_INFO, fetcher=canned_info)
+
+    with tempfile.TemporaryDirectory() as directory:
+        portfolio = Portfolio(source.tickers, period=f'{int(years)}y', cache=PriceCache(directory, source=source))
+
+        start = time.perf_counter()
+        long_format = portfolio.daily_info
+        long_seconds = time.perf_counter() - start
+
+        portfolio.invalidate()
+        start = time.perf_counter()
+        compact = portfolio.get_compact_daily_info()
+        compact_seconds = time.perf_counter() - start
+
+    return {
+        'rows': len(long_format),
+        'long_bytes': int(long_format.memory_usage(deep=True).sum()),
+        'compact_bytes': compact.memory_usage(),
+        'long_seconds': long_seconds,
+        'compact_seconds': compact_seconds
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=float, default=6)
+    args = parser.parse_args()
+
+    result = run(args.tickers, args.years)
+    print(f"{args.tickers} tickers x {args.years} years, {result['rows']} rows")
+    print(f"daily_info:         {result['long_bytes'] / 1024 ** 2:10.1f} MiB {result['long_seconds']:8.2f} s")
+    print(f"compact daily info: {result['compact_bytes'] / 1024 ** 2:10.1f} MiB {result['compact_seconds']:8.2f} s")
+    print(f"memory ratio:       {result['long_bytes'] / result['compact_bytes']:10.1f} x")
@@ -0,0 +1,92 @@
+"""
+Guards the cold start of the project: every module is imported in a fresh interpreter, its import time is
+compared with a budget, and heavy dependencies (yfinance, pypfopt, cvxpy, skfolio) must not be loaded by the
+import itself - only by the functions which need them. Exits with a non-zero status on a regression.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 5 --scale 2
+"""
+import sys
+import json
+import argparse
+import subprocess
+
+from typing import Dict
+
+
+# Budgets (in seconds) of a cold import, pandas and numpy alone take most of them
+BUDGETS = {
+    'instrumentation': 1.0,
+    'data_cache': 1.0,
+    'asset_info': 1.0,
+    'streaming': 1.0,
+    'data_gathering': 1.0,
+    'yf_data_gathering': 1.0,
+    'optimization': 1.0,
+    'hrp': 1.0,
+    'allocation': 1.0,
+    'backtesting': 1.0,
+    'price_service': 1.0,
+    'universes': 1.0,
+    'price_snapshot': 1.0,
+    'scenarios': 1.0,
+    'grid_view': 1.0,
+    'app': 3.0
+}
+
+# Dependencies which take seconds to import (or touch the network) and are imported lazily
+HEAVY_MODULES = ('yfinance', 'pypfopt', 'cvxpy', 'skfolio')
+
+_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeat: int = 3) -> dict:
+    """
+    Returns the fastest of repeat cold imports of the module and the heavy modules it loaded.
+    """
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            return {'seconds': None, 'heavy': [], 'error': completed.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {'seconds': min(run['seconds'] for run in runs), 'heavy': runs[0]['heavy'], 'error': None}
+
+
+def run(budgets: Dict[str, float] = BUDGETS, repeat: int = 3, scale: float = 1.0) -> bool:
+    ok = True
+    for module, budget in budgets.items():
+        result = measure(module, repeat)
+        if result['error']:
+            status = f"FAILED  {result['error']}"
+            ok = False
+        elif result['heavy']:
+            status = f"HEAVY   loaded {', '.join(result['heavy'])}"
+            ok = False
+        elif result['seconds'] > budget * scale:
+            status = f"SLOW    budget {budget * scale:.2f} s"
+            ok = False
+        else:
+            status = 'ok'
+        seconds = f"{result['seconds']:6.2f} s" if result['seconds'] is not None else '     - '
+        print(f"{module:20} {seconds}  {status}")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='Number of cold imports per module, the fastest counts')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier of all budgets, e.g. for slow machines')
+    args = parser.parse_args()
+
+    sys.exit(0 if run(repeat=args.repeat, scale=args.scale) else 1)
@@ -0,0 +1,279 @@
+"""
+Offline benchmark suite of the Portfolio pipeline on deterministic synthetic data. For every size (number of
+tickers x years of daily history) a SyntheticSource stands in for Yahoo behind a fresh PriceCache, asset info
+comes from canned_info, and every stage is measured: download (cold cache), download_cached, daily_returns,
+daily_info, calculate_averages, estimates (PortfolioOptimization) and optimize.<method>.
+
+Time is the best of --repeat runs, peak memory (tracemalloc, above what was allocated before the stage) comes
+from one more run, since tracing slows everything down. Results are saved as JSON together with the
+instrumentation profile of a timed run, and can be compared with an earlier file to catch regressions.
+
+Usage:
+    python -m benchmarks.suite --tickers 20 500 3000 --years 1 5 10 --output results.json
+    python -m benchmarks.suite --tickers 20 500 --years 1 5 --compare results.json
+"""
+import sys
+import json
+import importlib
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import hrp
+import optimization
+import instrumentation
+
+from asset_info import fetch_asset_info
+from data_cache import PriceCache
+from data_gathering import Portfolio, RELEVANT_INFO, calculate_averages
+from benchmarks.synthetic import SyntheticSource, canned_info
+
+
+# Last day of the synthetic history, fixed so that every run of the suite uses the same dates
+END_DATE = '2024-12-31'
+
+DEFAULT_TICKERS = (20, 500, 3000)
+DEFAULT_YEARS = (1, 5, 10)
+DEFAULT_METHODS = ('MV', 'HRP')
+
+# Libraries the pipeline imports lazily, imported before the first case so that it is not charged for them
+# (sklearn.covariance is imported by CovarianceShrinkage.ledoit_wolf on its first call)
+LAZY_IMPORTS = ('pypfopt.expected_returns', 'pypfopt.risk_models', 'pypfopt.efficient_frontier', 'cvxpy',
+                'sklearn.covariance')
+
+
+def _stages(source: SyntheticSource, directory: str, methods: List[str]) -> Iterator[Tuple[str, Callable]]:
+    # Stages of one pipeline run, in order, sharing the portfolio and the optimization through state
+    state = {}
+    cache = PriceCache(directory, source=source, max_bytes=64 * 1024 ** 3)
+    dates = {'start_date': source.panel.index[0], 'end_date': source.panel.index[-1] + pd.Timedelta(days=1)}
+
+    def download():
+        state['portfolio'] = Portfolio(source.tickers, cache=cache, **dates)
+
+    def download_cached():
+        state['portfolio'] = Portfolio(source.tickers, cache=cache, **dates)
+
+    def estimates():
+        state['optimization'] = optimization.PortfolioOptimization(state['portfolio'])
+
+    yield 'download', download
+    yield 'download_cached', download_cached
+    yield 'daily_returns', lambda: state['portfolio'].daily_returns
+    yield 'daily_info', lambda: state['portfolio'].daily_info
+    yield 'calculate_averages', lambda: calculate_averages(state['portfolio'].historical_data, 'Close')
+    yield 'estimates', estimates
+    for method in methods:
+        yield f'optimize.{method}', lambda method=method: state['optimization'].optimize(method)
+
+
+def _warm_up():
+    # Imports the lazy libraries and makes one small estimate, which also pays for the one-off work of their
+    # first calls (pypfopt checks the installed version of scikit-learn when the first CovarianceShrinkage is made)
+    for module in LAZY_IMPORTS:
+        importlib.import_module(module)
+    optimization.PortfolioOptimization(SyntheticSource(5, 0.5, end=END_DATE).panel['Close'])
+    _clear_caches()
+
+
+def _clear_caches():
+    # Estimates and clusterings are memoized by the fingerprint of the prices, every run must compute them again
+    optimization._ESTIMATES_CACHE.clear()
+    hrp._LINKAGE_CACHE.clear()
+
+
+def _run_stage(stage: Callable, errors: dict, name: str):
+    # A failing stage (e.g. a solver giving up on random walks) is recorded instead of stopping the suite
+    try:
+        stage()
+    except Exception as e:
+        errors[name] = f"{type(e).__name__}: {e}"
+
+
+@contextmanager
+def _tracing():
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(n_tickers: int, years: float, methods: List[str] = DEFAULT_METHODS, repeat: int = 1,
+             memory: bool = True, seed: int = 0) -> dict:
+    """
+    Benchmarks the pipeline for one size of the synthetic universe.
+
+    Parameters:
+    -----------
+    n_tickers : int
+        Number of synthetic tickers.
+
+    years : float
+        Length of the history in years of 252 trading days.
+
+    methods : list
+        Optimization methods to run, any of optimization.METHODS.
+
+    repeat : int
+        Number of timed runs, the fastest one is reported.
+
+    memory : bool
+        Whether to make one more run under tracemalloc to measure the peak memory of every stage.
+
+    seed : int
+        Seed of the synthetic data.
+
+    Returns:
+    --------
+    dict
+        'stages': stage name -> seconds and peak_bytes (None without memory), 'errors': stage name -> error
+        message of stages which failed, 'profile': instrumentation report (ProfileReport.to_dict) of the fastest
+        run, 'rows': number of trading days.
+    """
+    source = SyntheticSource(n_tickers, years, seed=seed, end=END_DATE)
+    # Filling the asset info cache, so that the portfolio never asks Yahoo
+    fetch_asset_info(source.tickers, RELEVANT_INFO, fetcher=canned_info)
+
+    seconds, profile, errors = {}, None, {}
+    for _ in range(repeat):
+        _clear_caches()
+        run_seconds = {}
+        with tempfile.TemporaryDirectory() as directory, instrumentation.profiling() as profiler:
+            for name, stage in _stages(source, directory, methods):
+                start = time.perf_counter()
+                _run_stage(stage, errors, name)
+                run_seconds[name] = time.perf_counter() - start
+        for name, value in run_seconds.items():
+            seconds[name] = min(seconds.get(name, np.inf), value)
+        if profile is None or sum(run_seconds.values()) < profile[0]:
+            profile = sum(run_seconds.values()), profiler.report().to_dict()
+
+    peaks = {}
+    if memory:
+        _clear_caches()
+        with tempfile.TemporaryDirectory() as directory, _tracing():
+            for name, stage in _stages(source, directory, methods):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                _run_stage(stage, errors, name)
+                peaks[name] = tracemalloc.get_traced_memory()[1] - before
+
+    return {
+        'rows': len(source.panel),
+        'stages': {name: {'seconds': value, 'peak_bytes': peaks.get(name)} for name, value in seconds.items()},
+        'errors': errors,
+        'profile': profile[1]
+    }
+
+
+def run(tickers: List[int] = DEFAULT_TICKERS, years: List[float] = DEFAULT_YEARS, methods: List[str] = DEFAULT_METHODS,
+        repeat: int = 1, memory: bool = True, seed: int = 0, log: Optional[Callable[[str], None]] = print) -> dict:
+    """
+    Runs run_case for every combination of tickers and years.
+
+    Returns:
+    --------
+    dict
+        'environment' (versions of Python and the libraries, machine), 'settings' and 'cases': a list of the
+        run_case results extended with 'tickers' and 'years'.
+    """
+    _warm_up()
+
+    cases = []
+    for n_tickers in tickers:
+        for n_years in years:
+            if log:
+                log(f"{n_tickers} tickers x {n_years} years ...")
+            case = run_case(n_tickers, n_years, methods=methods, repeat=repeat, memory=memory, seed=seed)
+            cases.append({'tickers': n_tickers, 'years': n_years, **case})
+    return {
+        'environment': {
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'system': platform.system(), 'processor': platform.processor()
+        },
+        'settings': {'methods': list(methods), 'repeat': repeat, 'memory': memory, 'seed': seed, 'end_date': END_DATE},
+        'cases': cases
+    }
+
+
+def to_frame(results: dict) -> pd.DataFrame:
+    """
+    Returns the measurements as a data frame indexed by (tickers, years, stage) with columns seconds and peak_bytes.
+    """
+    records = [
+        {'tickers': case['tickers'], 'years': case['years'], 'stage': name, **stats}
+        for case in results['cases'] for name, stats in case['stages'].items()
+    ]
+    return pd.DataFrame(records).set_index(['tickers', 'years', 'stage'])
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.25) -> pd.DataFrame:
+    """
+    Compares results with a baseline run (e.g. loaded from an earlier JSON file) on the measurements they share.
+
+    Parameters:
+    -----------
+    results, baseline : dict
+        Outputs of run.
+
+    tolerance : float
+        Relative growth of time or peak memory above which a stage counts as a regression.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Ratios (current / baseline) of seconds and peak_bytes and a boolean 'regression' column.
+    """
+    current, previous = to_frame(results), to_frame(baseline)
+    shared = current.index.intersection(previous.index)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = (current.loc[shared].astype(float) / previous.loc[shared].astype(float)).add_suffix(' ratio')
+    ratios['regression'] = (ratios > 1 + tolerance).any(axis=1)
+    return ratios
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, nargs='+', default=list(DEFAULT_TICKERS))
+    parser.add_argument('--years', type=float, nargs='+', default=list(DEFAULT_YEARS))
+    parser.add_argument('--methods', nargs='+', default=list(DEFAULT_METHODS), 
+                        choices=('MV', 'HRP', 'min_volatility'))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file to save the results to')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run(args.tickers, args.years, args.methods, args.repeat, not args.no_memory, args.seed)
+    frame = to_frame(results)
+    frame['peak MiB'] = frame.pop('peak_bytes') / 1024 ** 2
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.max_rows', None):
+        print(frame)
+    for case in results['cases']:
+        for name, error in case['errors'].items():
+            print(f"{case['tickers']} tickers x {case['years']} years, {name} failed: {error}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            ratios = compare(results, json.load(file), args.tolerance)
+        with pd.option_context('display.float_format', '{:.2f}'.format, 'display.max_rows', None):
+            print(ratios)
+        if ratios['regression'].any():
+            print(f"Regressions above {100 * args.tolerance:.0f} %:", file=sys.stderr)
+            print(ratios[ratios['regression']], file=sys.stderr)
+            sys.exit(1)
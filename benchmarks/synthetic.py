@@ -0,0 +1,93 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from typing import List, Optional
+
+
+FIELDS = ['Close', 'High', 'Low', 'Open', 'Volume']
+
+
+def synthetic_panel(tickers: List[str], dates: pd.DatetimeIndex, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates deterministic OHLCV history (geometric random walks) in the layout returned by
+    yf.download(..., group_by='column'): index 'Date', multi-level columns (Price, Ticker).
+
+    Parameters:
+    -----------
+    tickers : list
+        Names of the synthetic tickers.
+
+    dates : pandas.DatetimeIndex
+        Trading days of the panel.
+
+    seed : int
+        Seed of the random generator, the same seed always gives the same panel.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Synthetic prices and volumes.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (len(dates), len(tickers))
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, shape), axis=0))
+    open_ = close * (1 + rng.normal(0, 0.005, shape))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, shape)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, shape)))
+    volume = rng.integers(10_000, 1_000_000, shape).astype(np.float64)
+
+    values = {'Close': close, 'High': high, 'Low': low, 'Open': open_, 'Volume': volume}
+    data = pd.DataFrame(
+        np.concatenate([values[field] for field in FIELDS], axis=1),
+        index=pd.DatetimeIndex(dates, name='Date'),
+        columns=pd.MultiIndex.from_product([FIELDS, tickers], names=['Price', 'Ticker'])
+    )
+    return data
+
+
+class SyntheticSource:
+    """
+    Offline replacement of Yahoo Finance implementing data_cache.DataSource. The whole panel is generated
+    once and every download returns a slice of it, so overlapping requests always agree.
+
+    Parameters:
+    -----------
+    n_tickers : int
+        Number of synthetic tickers (named SYN0000, SYN0001, ...).
+
+    years : float
+        Length of the history in years of 252 trading days, ending yesterday.
+
+    seed : int
+        Seed of the random generator.
+    """
+    def __init__(self, n_tickers: int, years: float, seed: int = 0, end: Optional[str] = None):
+        self.tickers = [f'SYN{i:04d}' for i in range(n_tickers)]
+        end = pd.Timestamp(end) if end else pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+        dates = pd.bdate_range(end=end, periods=int(252 * years))
+        self.panel = synthetic_panel(self.tickers, dates, seed=seed)
+        self.downloads = 0
+
+    def download(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp, interval: str) -> pd.DataFrame:
+        self.downloads += 1
+        rows = self.panel.loc[(self.panel.index >= start) & (self.panel.index < end)]
+        return rows.reindex(columns=pd.MultiIndex.from_product([FIELDS, tickers], names=['Price', 'Ticker']))
+
+
+def canned_info(ticker: str) -> dict:
+    """
+    Offline replacement of the Yahoo info fetcher (see asset_info.fetch_asset_info), returns a fixed
+    dictionary derived from the ticker name.
+    """
+    code = zlib.crc32(ticker.encode())
+    return {
+        'city': f'City{code % 50}', 'country': f'Country{code % 10}', 'industryKey': f'industry{code % 70}',
+        'sectorKey': f'sector{code % 11}', 'fullTimeEmployees': code % 100_000, 'currency': 'USD',
+        'tradeable': False, 'quoteType': 'EQUITY', 'financialCurrency': 'USD', 'region': 'US',
+        'fullExchangeName': 'NasdaqGS', 'exchange': 'NMS', 'exchangeTimezoneName': 'America/New_York',
+        'market': 'us_market', 'marketCap': code * 1000, 'shortName': f'{ticker} Synthetic Inc.',
+        'ebitda': code * 10, 'totalDebt': code * 5, 'debtToEquity': (code % 300) / 100, 'totalRevenue': code * 50
+    }
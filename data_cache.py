@@ -0,0 +1,370 @@
+import os
+import re
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List, Optional, Protocol, Tuple
+from urllib.parse import quote
+
+import instrumentation
+
+
+class DataSource(Protocol):
+    """
+    Anything that can deliver OHLCV history in the yfinance layout, i.e. a data frame indexed by 'Date' with
+    multi-level columns (Price, Ticker). The cache only talks to this interface, so Yahoo can be replaced by
+    a fake source (e.g. in tests or benchmarks) without touching the rest of the code.
+    """
+    def download(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp, interval: str) -> pd.DataFrame:
+        ...
+
+
+class YahooSource:
+    """
+    Default data source, a thin wrapper around yf.download.
+    """
+    def download(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp, interval: str) -> pd.DataFrame:
+        # yfinance is imported only when something is actually downloaded, it is slow to import
+        import yfinance as yf
+
+        data = yf.download(tickers, group_by='column', start=start, end=end, interval=interval, progress=False)
+        if not isinstance(data.columns, pd.MultiIndex):
+            # Older yfinance versions return flat columns for a single ticker
+            data.columns = pd.MultiIndex.from_product([data.columns, tickers[:1]])
+        data.columns = data.columns.set_names(['Price', 'Ticker'])
+        return data
+
+
+def resolve_dates(start_date=None, end_date=None, period: str = '1y') -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Translates the (start_date, end_date) or period arguments used across the project into an explicit
+    [start, end) range. yfinance treats the end date as exclusive, so the default end is tomorrow which
+    includes today's bar.
+
+    Parameters:
+    -----------
+    start_date, end_date : str or datetime, optional
+        Explicit dates. Used only if both of them are given.
+
+    period : str
+        yfinance period string, e.g. '5d', '3mo', '6y', 'ytd' or 'max'.
+
+    Returns:
+    --------
+    tuple of pandas.Timestamp
+        Start (inclusive) and end (exclusive) of the range.
+    """
+    if start_date and end_date:
+        return pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+
+    today = pd.Timestamp.today().normalize()
+    end = today + pd.Timedelta(days=1)
+    if period == 'max':
+        return pd.Timestamp('1900-01-01'), end
+    if period == 'ytd':
+        return pd.Timestamp(year=today.year, month=1, day=1), end
+
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Unknown period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    offsets = {
+        'd': pd.offsets.BDay(n),  # trading days, so that '1d' on a weekend still returns the last session
+        'wk': pd.DateOffset(weeks=n),
+        'mo': pd.DateOffset(months=n),
+        'y': pd.DateOffset(years=n)
+    }
+    return today - offsets[unit], end
+
+
+class PriceCache:
+    """
+    Persistent on-disk cache of OHLCV history, stored column-wise as memory-mapped NumPy arrays.
+
+    Every (interval, ticker) pair is kept in its own directory with three files: 'index.npy' (bar timestamps),
+    'values.npy' (one column per price field) and 'meta.json' (field names and the date range that has already
+    been requested from the source). On a request only the missing part of the range is downloaded - usually
+    just the bars after the last cached one - and merged into the stored arrays. A range is marked as covered
+    only if the ticker returned some bars in it, or if it ends at the first cached bar (the ticker was not listed
+    yet). Other empty answers - failed tickers (yfinance returns empty columns for them instead of raising),
+    delisted ones or exchange holidays - are remembered and the range is requested again only after retry_after.
+    Gaps without any weekday are never requested, and the bars of the current day are downloaded again only after
+    max_age. When the cache grows above max_bytes, the least recently used entries are removed.
+
+    Parameters:
+    -----------
+    directory : str
+        Root directory of the cache. Created if it does not exist.
+
+    source : DataSource, optional
+        Where missing data comes from. Yahoo Finance by default.
+
+    max_bytes : int
+        Size limit of the cache on disk.
+
+    max_age : float
+        Time (in seconds) after which the bar of the current day, which may still change, is downloaded again.
+
+    retry_after : float
+        Time (in seconds) after which a range for which the source returned no bars is requested again.
+    """
+    def __init__(self, directory: str, source: Optional[DataSource] = None, max_bytes: int = 512 * 1024 ** 2,
+                 max_age: float = 15 * 60, retry_after: float = 15 * 60):
+        self.directory = directory
+        self.source = source if source is not None else YahooSource()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retry_after = retry_after
+        os.makedirs(directory, exist_ok=True)
+
+    def get(
+            self,
+            tickers: List[str],
+            start_date=None,
+            end_date=None,
+            period: str = '1y',
+            interval: str = '1d',
+            retry_empty: bool = False
+            ) -> pd.DataFrame:
+        """
+        Returns OHLCV history for the tickers in the yfinance column grouped layout, downloading only what
+        is not cached yet.
+
+        Args:
+            tickers (List[str]): List of stock tickers.
+            start_date, end_date (Optional): Explicit date range (end exclusive). Used if both are given.
+            period (str): yfinance period used when the dates are not given.
+            interval (str): Bar interval, e.g. '1d' or '1wk'.
+            retry_empty (bool): Whether to request ranges which returned no bars again before retry_after,
+                e.g. when retrying tickers which failed a moment ago.
+
+        Returns:
+            pd.DataFrame: Data frame indexed by 'Date' with multi-level columns (Price, Ticker).
+        """
+        start, end = resolve_dates(start_date, end_date, period)
+        entries = {ticker: self._read(ticker, interval) for ticker in tickers}
+
+        # Grouping tickers by the range they are missing, so that each distinct range is one download
+        missing: Dict[Tuple[pd.Timestamp, pd.Timestamp], List[str]] = {}
+        for ticker, entry in entries.items():
+            for gap in self._gaps(entry, start, end, retry_empty):
+                missing.setdefault(gap, []).append(ticker)
+        n_missing = len({ticker for gap_tickers in missing.values() for ticker in gap_tickers})
+        instrumentation.cache_access('price_cache', hits=len(entries) - n_missing, misses=n_missing)
+
+        for (gap_start, gap_end), gap_tickers in missing.items():
+            with instrumentation.stage('price_cache.download'):
+                fetched = self.source.download(gap_tickers, gap_start, gap_end, interval)
+            instrumentation.count('price_cache.downloaded_rows', len(fetched))
+            for ticker in gap_tickers:
+                new, entry = self._extract(fetched, ticker), entries[ticker]
+                if not new.empty:
+                    entries[ticker] = self._merge(entry, new, gap_start, gap_end)
+                elif entry is not None and len(entry['data']) and gap_end == entry['covered_from']:
+                    # No bars before the first cached one, the ticker was not listed yet
+                    entry['covered_from'] = gap_start
+                else:
+                    # A failed or delisted ticker, or an exchange holiday, the range is tried again after retry_after
+                    entries[ticker] = self._mark_empty(entry, new, gap_start, gap_end)
+                self._write(ticker, interval, entries[ticker])
+
+        if missing:
+            self._evict(keep={self._path(ticker, interval) for ticker in tickers})
+
+        frames = {}
+        for ticker, entry in entries.items():
+            data = entry['data'].loc[(entry['data'].index >= start) & (entry['data'].index < end)]
+            frames[ticker] = data.tz_localize(entry['tz']) if entry['tz'] else data
+        data = pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+        data.columns = data.columns.swaplevel(0, 1)
+        # The copy consolidates the per-ticker blocks left by concat, later column selections stay fast
+        data = data.sort_index(axis=1, level=0, sort_remaining=False).sort_index().copy()
+        data.index.name = 'Date'
+        return data
+
+    def size(self) -> int:
+        """
+        Returns the total size of the cached files in bytes.
+        """
+        return sum(self._entry_size(path) for path in self._entries())
+
+    def clear(self):
+        """
+        Removes every cached entry.
+        """
+        for path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    # ---------------------------------------------------------------------------------------------------------#
+
+    def _path(self, ticker: str, interval: str) -> str:
+        # quote() keeps tickers like '^GSPC' or 'BRK/B' safe to use as directory names
+        return os.path.join(self.directory, interval, quote(ticker, safe=''))
+
+    def _read(self, ticker: str, interval: str) -> Optional[dict]:
+        path = self._path(ticker, interval)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        index = np.load(os.path.join(path, 'index.npy'), mmap_mode='r')
+        values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+        # Timestamps are kept as naive local time, the time zone of intraday bars is stored in meta
+        data = pd.DataFrame(values, index=pd.DatetimeIndex(index.astype('datetime64[ns]')), columns=meta['fields'])
+
+        # Touching the entry marks it as recently used for the eviction
+        os.utime(meta_path)
+        return {
+            'data': data,
+            'tz': meta.get('tz'),
+            'covered_from': pd.Timestamp(meta['covered_from']),
+            'covered_until': pd.Timestamp(meta['covered_until']),
+            **{key: pd.Timestamp(meta[key]) if meta.get(key) else None
+               for key in ('fetched_at', 'empty_from', 'empty_until', 'empty_at')}
+        }
+
+    def _write(self, ticker: str, interval: str, entry: dict):
+        path = self._path(ticker, interval)
+        os.makedirs(path, exist_ok=True)
+        data = entry['data']
+
+        # Writing to temporary files first, so an interrupted write never leaves a half-updated entry
+        arrays = {
+            'index.npy': data.index.values.astype('datetime64[ns]').astype(np.int64),
+            'values.npy': data.to_numpy(dtype=np.float64)
+        }
+        for name, array in arrays.items():
+            with open(os.path.join(path, name + '.tmp'), 'wb') as f:
+                np.save(f, array)
+            os.replace(os.path.join(path, name + '.tmp'), os.path.join(path, name))
+
+        meta = {
+            'fields': data.columns.to_list(),
+            'tz': entry['tz'],
+            'covered_from': entry['covered_from'].isoformat(),
+            'covered_until': entry['covered_until'].isoformat(),
+            **{key: entry[key].isoformat() if entry.get(key) is not None else None
+               for key in ('fetched_at', 'empty_from', 'empty_until', 'empty_at')}
+        }
+        with open(os.path.join(path, 'meta.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(path, 'meta.json.tmp'), os.path.join(path, 'meta.json'))
+
+    def _gaps(self, entry: Optional[dict], start: pd.Timestamp, end: pd.Timestamp,
+              retry_empty: bool = False) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        if entry is None:
+            return [(start, end)]
+        gaps = []
+        if start < entry['covered_from']:
+            gaps.append((start, entry['covered_from']))
+        if end > entry['covered_until']:
+            gaps.append((entry['covered_until'], end))
+
+        # No session can fall into a gap without weekdays (e.g. a weekend), the current day was asked for
+        # a moment ago if the entry is fresh, and a range which recently returned nothing is not asked for again
+        now = pd.Timestamp.now()
+        today = now.normalize()
+        fetched_at, empty_at = entry.get('fetched_at'), entry.get('empty_at')
+        fresh = fetched_at is not None and now - fetched_at < pd.Timedelta(seconds=self.max_age)
+        recently_empty = not retry_empty and empty_at is not None and now - empty_at < pd.Timedelta(seconds=self.retry_after)
+        return [
+            (gap_start, gap_end) for gap_start, gap_end in gaps
+            if len(pd.bdate_range(gap_start, gap_end, inclusive='left'))
+            and not (fresh and gap_start >= today)
+            and not (recently_empty and entry['empty_from'] <= gap_start and gap_end <= entry['empty_until'])
+        ]
+
+    @staticmethod
+    def _extract(fetched: pd.DataFrame, ticker: str) -> pd.DataFrame:
+        if ticker not in fetched.columns.get_level_values(1):
+            return pd.DataFrame(index=pd.DatetimeIndex([]))
+        data = fetched.xs(ticker, axis=1, level=1)
+        # Same resolution as the timestamps read back from disk, so fresh and cached frames always agree
+        data.index = data.index.as_unit('ns')
+        # Multi-ticker downloads are outer joined on dates, rows where this ticker did not trade are dropped
+        return data.dropna(how='all')
+
+    @staticmethod
+    def _mark_empty(entry: Optional[dict], new: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> dict:
+        if entry is None:
+            # Nothing is covered yet, the entry only remembers the empty answer
+            entry = {'data': new, 'tz': None, 'covered_from': start, 'covered_until': start, 'fetched_at': None}
+        return {**entry, 'empty_from': start, 'empty_until': end, 'empty_at': pd.Timestamp.now()}
+
+    @staticmethod
+    def _merge(entry: Optional[dict], new: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> dict:
+        tz = str(new.index.tz) if new.index.tz is not None else None
+        if tz:
+            new = new.tz_localize(None)
+        # Today's bar may still change, so the range is marked as covered only up to the start of today
+        covered_until = max(min(end, pd.Timestamp.today().normalize()), start)
+
+        fetched_at = pd.Timestamp.now()
+
+        if entry is None:
+            return {'data': new.sort_index(), 'tz': tz, 'covered_from': start, 'covered_until': covered_until,
+                    'fetched_at': fetched_at}
+
+        # Newer bars replace the cached ones with the same timestamp
+        data = pd.concat([entry['data'], new])
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        return {
+            'data': data,
+            'tz': entry['tz'] or tz,
+            'covered_from': min(entry['covered_from'], start),
+            'covered_until': max(entry['covered_until'], covered_until),
+            'fetched_at': fetched_at
+        }
+
+    def _entries(self) -> List[str]:
+        paths = []
+        if not os.path.isdir(self.directory):
+            return paths
+        for interval in os.listdir(self.directory):
+            interval_dir = os.path.join(self.directory, interval)
+            if os.path.isdir(interval_dir):
+                paths.extend(os.path.join(interval_dir, name) for name in os.listdir(interval_dir))
+        return paths
+
+    @staticmethod
+    def _entry_size(path: str) -> int:
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    def _evict(self, keep: set):
+        entries = self._entries()
+        sizes = {path: self._entry_size(path) for path in entries}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        # Least recently used first, entries used by the current request are never evicted
+        def last_used(path):
+            meta_path = os.path.join(path, 'meta.json')
+            return os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0.0
+
+        for path in sorted(entries, key=last_used):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+
+_DEFAULT_CACHE: Optional[PriceCache] = None
+
+
+def get_default_cache() -> PriceCache:
+    """
+    Returns the cache shared by Portfolio and gather_data. Its location can be changed with the
+    PRICE_CACHE_DIR environment variable (default: ~/.cache/portfolio_prices).
+    """
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        directory = os.environ.get('PRICE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'portfolio_prices'))
+        _DEFAULT_CACHE = PriceCache(directory)
+    return _DEFAULT_CACHE
@@ -1,31 +1,47 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import datetime
 
-from typing import List, Optional
-from pypfopt.expected_returns import mean_historical_return
-from pypfopt.risk_models import CovarianceShrinkage
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
 
-def calculate_averages(df, column):
+import instrumentation
+
+from asset_info import AssetInfoResult, fetch_asset_info
+from data_cache import PriceCache, get_default_cache
+from streaming import PriceChunk, stream_prices
+from universes import WIG20
+
+# Trailing windows (in trading days, depends on convention) used by calculate_averages and their column name suffixes
+AVERAGE_PERIODS = {
+    'Day': 1, 'Week': 5, 'Month': 63, 'Quarter': 90, 'HalfYear': 126,
+    '1Y': 252, '2Y': 504, '3Y': 756, '4Y': 1008, '5Y': 1260
+}
+
+@instrumentation.timed('calculate_averages')
+def calculate_averages(df, column, periods: Optional[List[int]] = None):
     """
     Calculates averages of a user-specified column (e.g., 'Open', 'Close', 'Volume') for different time periods
     (from 1 day to 5 years) measured in number of days for each ticker in the DataFrame, where the tickers are the column names.
 
     This function assumes the DataFrame has a 'Date' column and that the tickers are the column names. Data frame is assumed to be
-    multi-leveled as an output from yfinance functions.
-    It calculates the average for various time periods for each ticker and returns the result as a new DataFrame.
+    one level of the multi-leveled output from yfinance functions, e.g. data['Close'].
+    All windows for all tickers are calculated in one pass: values are ordered from the most recent date, cumulative sums of
+    values and of non-missing counts are taken once, and the average over the last n days is read from row n of both.
 
     Parameters:
     -----------
     df : pandas.DataFrame
         DataFrame that contains a 'Date' column and the column for which averages are calculated (e.g., 'Close', 'Volume').
-        The tickers are the column names. Columns have to be multi-level indexe, it means column argument is the highest and tickers
-        are one level below.
+        The tickers are the column names.
         
     column : str
         The name of the column for which averages will be calculated (e.g., 'Close', 'Volume'). They are related to prices.
 
+    periods : list of int, optional
+        Lengths of the trailing windows in trading days. Defaults to the values of AVERAGE_PERIODS. Windows which are not
+        in AVERAGE_PERIODS are named after their length, e.g. averageClosePriceLast10Days.
+
     Returns:
     --------
     pandas.DataFrame
@@ -33,56 +49,113 @@ def calculate_averages(df, column):
         Columns will include the ticker and the averages for periods such as 'Day', 'Week', 'Month', etc.
 
     """
-    # Ensure the DataFrame is sorted by descending 'Date' to calculate averages correctly
+    if periods is None:
+        periods = list(AVERAGE_PERIODS.values())
+    columns = _average_columns(column, periods)
+
+    # Most recent dates first, only as many rows as the longest window needs
     df = df.sort_values('Date', ascending=False)
+    values = df.to_numpy(dtype=np.float64)[:max(periods, default=0)]
+
+    # NaN-aware running sums: missing values add nothing to the sum and are not counted
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+
+    if len(values):
+        rows = np.minimum(periods, len(values)) - 1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages = np.where(counts[rows] > 0, sums[rows] / counts[rows], np.nan)
+    else:
+        averages = np.full((len(periods), df.shape[1]), np.nan)
+
+    aggregated_df = pd.DataFrame(averages.T, columns=columns)
+    aggregated_df.insert(0, 'Ticker', df.columns.to_list())
     
-    # Get the list of tickers (column names)
-    tickers = df.columns.to_list()  
-    
-    # Define the periods (in days) for which we want to calculate the averages
-    periods = [1, 5, 63, 90, 126, 252, 504, 756, 1008, 1260]  # Periods in trading days (depends on convention)
-    
+    return aggregated_df
+
+
+def _average_columns(column, periods):
+    labels = {days: label for label, days in AVERAGE_PERIODS.items()}
+
     # Define column names dynamically based on the input column
     if column == 'Volume':
         base = f"average{column}Last{{}}"
     else:
         base = f"average{column}PriceLast{{}}"  # For price-related columns like 'Close', 'Open'
-    
-    # Create column names based on periods (e.g., averageLastDayClosePrice, averageLastWeekVolume, etc.)
-    columns = [
-        'Ticker',
-        base.format('Day'),
-        base.format('Week'),
-        base.format('Month'),
-        base.format('Quarter'),
-        base.format('HalfYear'),
-        base.format('1Y'),
-        base.format('2Y'),
-        base.format('3Y'),
-        base.format('4Y'),
-        base.format('5Y')
-    ]
-    
-    data_rows = []  # List to hold rows of data for the final DataFrame
-    
-    for ticker in tickers:
-        row = [ticker]        
-        for period in periods:
-            # Take the most recent 'period' number of rows (up to the current date)
-            sliced = df[ticker].iloc[:period]  # Take the last 'period' rows for this ticker
-            row.append(sliced.mean(skipna=True))  # Calculate mean, skipping NaNs
-        data_rows.append(row)
-    
-    # Create the final DataFrame from the collected data
-    aggregated_df = pd.DataFrame(data_rows, columns=columns)
-    
-    return aggregated_df
+    return [base.format(labels.get(period, f'{period}Days')) for period in periods]
+
+
+class TrailingAverages:
+    """
+    Incrementally updated counterpart of calculate_averages.
+
+    For every window the sum and the number of non-missing values over the last n rows are maintained, together
+    with the last max(periods) rows themselves. Appending k rows adds them to the sums and subtracts the rows which
+    fall out of each window, so the cost is O(k * tickers) per window, independent of the length of the history.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Values indexed by 'Date', tickers are the column names (e.g. Portfolio.historical_data).
+
+    column : str
+        Name of the averaged column, used for the names of the averages (see calculate_averages).
+
+    periods : list of int, optional
+        Lengths of the trailing windows in trading days. Defaults to the values of AVERAGE_PERIODS.
+    """
+    def __init__(self, df, column, periods: Optional[List[int]] = None):
+        self.column = column
+        self.periods = list(periods) if periods is not None else list(AVERAGE_PERIODS.values())
+        self.tickers = df.columns.to_list()
+        self.tail = np.empty((0, len(self.tickers)))
+        self.sums = np.zeros((len(self.periods), len(self.tickers)))
+        self.counts = np.zeros((len(self.periods), len(self.tickers)), dtype=np.int64)
+        self.append(df)
+
+    def append(self, df):
+        """
+        Adds rows newer than all the rows added before.
+        """
+        with instrumentation.stage('trailing_averages'):
+            self._append(df.reindex(columns=self.tickers).sort_index().to_numpy(dtype=np.float64))
+
+    def _append(self, new):
+        rows = np.concatenate([self.tail, new])
+        end = len(rows)
+        for i, n in enumerate(self.periods):
+            # Rows which were in the window before the append and are not in it after
+            dropped = rows[max(end - len(new) - n, 0):max(end - n, 0)]
+            self.sums[i] += np.nansum(new, axis=0) - np.nansum(dropped, axis=0)
+            self.counts[i] += np.count_nonzero(~np.isnan(new), axis=0) - np.count_nonzero(~np.isnan(dropped), axis=0)
+        self.tail = rows[-max(self.periods, default=0):] if self.periods else rows[:0]
+
+    def frame(self):
+        """
+        Returns the averages in the format of calculate_averages.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages = np.where(self.counts > 0, self.sums / self.counts, np.nan)
+        aggregated_df = pd.DataFrame(averages.T, columns=_average_columns(self.column, self.periods))
+        aggregated_df.insert(0, 'Ticker', self.tickers)
+        return aggregated_df
+
+
+def calculate_returns(prices):
+    """
+    Calculates daily returns of prices (dates x tickers): the return of a day is relative to the previous trading
+    day. Rows are returned from the most recent date, the oldest date has no return.
+    """
+    return prices.sort_index().pct_change().sort_index(ascending=False)
 
 
-def gather_asset_info(df, asset_info):
+@instrumentation.timed('gather_asset_info')
+def gather_asset_info(df, asset_info, result: Optional[AssetInfoResult] = None):
     """
     Gathers additional information for each ticker available through Yahoo Finance API.
     The tickers are assumed to be the column values of column 'Ticker' of the DataFrame.
+    Information is fetched concurrently and cached for some time (see fetch_asset_info).
 
     Parameters:
     -----------
@@ -93,52 +166,218 @@ def gather_asset_info(df, asset_info):
         A list of fields (strings) to fetch from Yahoo Finance for each ticker. For example: 
         ['previousClose', 'marketCap', 'peRatio'].
 
+    result : AssetInfoResult, optional
+        Already fetched information. If not provided, it is fetched for the distinct tickers of the DataFrame.
+
     Returns:
     --------
     pandas.DataFrame
         A new DataFrame with additional information for each ticker merged with the original DataFrame.
         The new DataFrame will contain the original data, along with the additional info for each ticker.
+        Tickers which could not be fetched have missing values (see AssetInfoResult.failures).
 
 
     """
-    
-    # Prepare column names for the additional information
-    columns = ['Ticker'] + asset_info
-    distinct_tickers = df['Ticker'].unique()
-    rows = []
-    
-    for ticker in distinct_tickers:
-        try:
-            # Fetch the information for the ticker from Yahoo Finance
-            info_dict = yf.Ticker(ticker).info
-            
-            # Extract the requested asset information, using None if the info is missing
-            data_row = [ticker] + [info_dict.get(field, None) for field in asset_info]
-            rows.append(data_row)
-        except Exception as e:
-            print(f"Warning: Could not retrieve info for {ticker}: {e}")
-            continue
-    
-    # Create a DataFrame from the gathered rows
-    df_additional_info = pd.DataFrame(rows, columns=columns)
+    if result is None:
+        result = fetch_asset_info(df['Ticker'].unique().tolist(), asset_info)
     
     # Merge the additional information with the original DataFrame (on 'Ticker')
-    enriched_df = pd.merge(df, df_additional_info, how='left', on= 'Ticker')
+    enriched_df = pd.merge(df, result.info, how='left', on= 'Ticker')
     
     return enriched_df
 
+@instrumentation.timed('candle_features')
+def calculate_candle_features(df):
+    """
+    Calculates daily price change, daily return, range, volatility ratio, wicks and candle type for every row of
+    a long-format DataFrame (one row is one day for one ticker).
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        DataFrame with columns 'Open', 'High', 'Low' and 'Close'.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        A new DataFrame with the same index and one column per feature.
+    """
+    features = pd.DataFrame(index=df.index)
+    features['Change'] = df['Close'] - df['Open']
+    features['Daily Return'] = np.where(df['Open'] != 0, (df['Close'] - df['Open']) / df['Open'], np.nan)
+    features['Range'] = df['High'] - df['Low']
+    features['Volatility Ratio'] = features['Range'] / df['Open']
+    features['Upper Wick'] = df['High'] - np.maximum(df['Open'], df['Close'])
+    features['Lower Wick'] = np.minimum(df['Open'], df['Close']) - df['Low']
+    features['Candle type'] = np.where(df['Close'] > df['Open'], 1, 0)  # 1 means bullish, 0 means bearish
+    return features
+
+def to_long_format(data):
+    """
+    Turns column grouped data (multi-level columns (Price, Ticker)) into a long-format DataFrame indexed by 'Date'
+    with a 'Ticker' column and one column per price field. Days without any price for a ticker are dropped.
+    """
+    data = data.copy(deep=False)
+    data.columns = data.columns.swaplevel(0, 1).set_names(['Ticker', 'Price'])
+    # Handling multi-level columns in a harsh but elegant way
+    data = data.stack(level=0).rename_axis(['Date', 'Ticker']).reset_index(level=1)
+    # stack keeps all-NaN rows since pandas 3, dropping them explicitly gives the same rows with every version
+    return data.dropna(how='all', subset=[column for column in data.columns if column != 'Ticker'])
+
+
+# Steps applied to every chunk of a streamed download (see process_chunks), each one is a function of the
+# column grouped data of the chunk and the axis along which the results of the chunks are joined
+def chunk_returns(data):
+    """
+    Daily returns of Close prices of a chunk, the same as Portfolio.daily_returns.
+    """
+    close = data['Close'].copy(deep=False)
+    close.index.name = 'Date'
+    return calculate_returns(close)
+
+
+def chunk_averages(data):
+    """
+    Averages of Close prices and volumes of a chunk indexed by 'Ticker', the same as the averages of Portfolio.daily_info.
+    """
+    averages = [calculate_averages(data['Close'], 'Close'), calculate_averages(data['Volume'], 'Volume')]
+    return pd.concat([table.set_index('Ticker') for table in averages], axis=1)
+
+
+def chunk_candles(data):
+    """
+    Long-format prices of a chunk with the candle features, the same as Portfolio.get_daily_info(features=('candles',)).
+    """
+    long_data = to_long_format(data)
+    return pd.concat([long_data, calculate_candle_features(long_data)], axis=1)
+
+
+STREAM_STEPS = {
+    'returns': (chunk_returns, 1),
+    'averages': (chunk_averages, 0),
+    'candles': (chunk_candles, 0)
+}
+
+
+@dataclass
+class ChunkedTables:
+    """
+    Outcome of process_chunks.
+
+    Attributes:
+        tables (Dict[str, pd.DataFrame]): Results of the steps joined over all successful chunks.
+        failures (Dict[str, str]): Tickers which could not be downloaded, mapped to the error message.
+    """
+    tables: Dict[str, pd.DataFrame]
+    failures: Dict[str, str] = field(default_factory=dict)
+
+
+def process_chunks(chunks: Iterable[PriceChunk], steps=tuple(STREAM_STEPS)) -> ChunkedTables:
+    """
+    Consumes a stream of downloaded chunks (see streaming.stream_prices), applying the steps to every chunk as soon
+    as it arrives. Only the (much smaller) results of the steps are kept, the price data of a chunk is dropped
+    right after it is processed. Failed chunks and tickers are recorded and skipped.
+
+    Parameters:
+    -----------
+    chunks : iterable of PriceChunk
+        Downloaded chunks, e.g. stream_prices(tickers, period='5y', chunk_size=200).
+
+    steps : tuple
+        Names of STREAM_STEPS to apply: 'returns', 'averages' and/or 'candles'.
+
+    Returns:
+    --------
+    ChunkedTables
+        Joined results of the steps and the failed tickers.
+    """
+    unknown = set(steps) - set(STREAM_STEPS)
+    if unknown:
+        raise ValueError(f"Unknown steps: {sorted(unknown)}")
+
+    parts = {step: [] for step in steps}
+    failures = {}
+    for chunk in chunks:
+        failures.update(chunk.failures)
+        if chunk.failed:
+            continue
+        for step in steps:
+            parts[step].append(STREAM_STEPS[step][0](chunk.data))
+
+    tables = {}
+    for step, results in parts.items():
+        axis = STREAM_STEPS[step][1]
+        tables[step] = pd.concat(results, axis=axis) if results else pd.DataFrame()
+        if step == 'returns':
+            tables[step] = tables[step].sort_index(ascending=False)
+    return ChunkedTables(tables=tables, failures=failures)
+
+
 # some info that me and Marek thought it is a good idea to fetch form yfinance API
 RELEVANT_INFO = [
     'city', 'country', 'industryKey', 'sectorKey', 'fullTimeEmployees', 'currency', 'tradeable', 'quoteType',
     'financialCurrency', 'region', 'fullExchangeName', 'exchange', 'exchangeTimezoneName', 'market', 'marketCap',
     'shortName', 'ebitda', 'totalDebt', 'debtToEquity', 'totalRevenue']
 
+# Groups of features which can be requested from Portfolio.get_daily_info
+DAILY_INFO_FEATURES = ('candles', 'averages', 'asset_info')
+
+class CompactDailyInfo:
+    """
+    Compact alternative to the long-format Portfolio.daily_info table.
+
+    Daily values are kept in a fact table with a categorical 'Ticker' column (stored as small integer codes) and
+    float32 prices and features. Values which do not depend on the date (averages, asset information) are kept
+    once per ticker in a separate dimension table and are joined to the daily rows only when asked for.
+
+    Attributes:
+        facts (pd.DataFrame): One row per day and ticker, indexed by 'Date'.
+        tickers (pd.DataFrame): One row per ticker, indexed by 'Ticker' in the order of the categories of facts['Ticker'].
+    """
+    def __init__(self, facts: pd.DataFrame, tickers: pd.DataFrame):
+        self.facts = facts
+        self.tickers = tickers
+
+    def attribute(self, name: str) -> pd.Series:
+        """
+        Returns a ticker-level column repeated for every daily row, looked up by the ticker codes.
+        """
+        codes = self.facts['Ticker'].cat.codes.to_numpy()
+        return pd.Series(self.tickers[name].to_numpy()[codes], index=self.facts.index, name=name)
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Joins the daily rows with the ticker-level columns, giving the same layout as Portfolio.daily_info.
+
+        Args:
+            columns (Optional[List[str]]): Ticker-level columns to join, all of them if not provided.
+
+        Returns:
+            pd.DataFrame: The daily rows with the requested ticker-level columns.
+        """
+        columns = self.tickers.columns.to_list() if columns is None else columns
+        codes = self.facts['Ticker'].cat.codes.to_numpy()
+        joined = self.tickers[columns].iloc[codes].set_index(self.facts.index)
+        return pd.concat([self.facts, joined], axis=1)
+
+    def memory_usage(self) -> int:
+        """
+        Returns the memory used by both tables in bytes.
+        """
+        return int(self.facts.memory_usage(deep=True).sum() + self.tickers.memory_usage(deep=True).sum())
+
+
 class Portfolio:
     """
     A class for managing a collection of stock tickers, downloading financial data from Yahoo Finance, 
     and performing analysis such as daily price changes, volatility, and candle patterns. It is mainly a preparation to
     maintain clean code through entire project. 
 
+    Only the price data is downloaded on construction. Derived tables (daily_info, daily_returns, historical_data)
+    and the feature groups of daily_info are computed on first access and memoized; assigning new prices to
+    column_grouped_data (or calling invalidate) drops everything memoized. New trading days are added with update,
+    which extends the memoized tables instead of recomputing them.
+
     Parameters:
     -----------
     tickers : list
@@ -152,6 +391,14 @@ class Portfolio:
     
     period : str, optional
         The period for fetching data (e.g., '1d', '1wk', '1mo', '1y'). Only used if start_date and end_date are not provided.
+
+    cache : PriceCache, optional
+        On-disk price cache used for downloading. The shared default cache is used if not provided.
+
+    chunk_size : int, optional
+        If given, tickers are downloaded in chunks of this size (see streaming.stream_prices). Tickers which
+        could not be downloaded (failed chunks, or no bars after every retry) are left out of the data and listed
+        in download_failures.
     
     """
     def __init__(
@@ -159,7 +406,9 @@ class Portfolio:
                  tickers: List[str], 
                  start_date: Optional[str] = None, 
                  end_date: Optional[str] = None, 
-                 period: str = '1d'
+                 period: str = '1d',
+                 cache: Optional[PriceCache] = None,
+                 chunk_size: Optional[int] = None
                 ):
         """
         Initializes the Portfolio class, determines the period to use for data download, and fetches stock data.
@@ -169,6 +418,8 @@ class Portfolio:
             start_date (Optional[str]): The start date for downloading data.
             end_date (Optional[str]): The end date for downloading data.
             period (str): The period for downloading stock data (e.g., '1d', '1wk').
+            cache (Optional[PriceCache]): Price cache to read from, the default cache if not provided.
+            chunk_size (Optional[int]): Number of tickers downloaded at once, all of them if not provided.
         """
         # Managing the optionality of start-end dates and period:
         if start_date and end_date:
@@ -181,32 +432,154 @@ class Portfolio:
 
         # Not sure if this attribute will be held in the future
         self.tickers = tickers
+        self.cache = cache if cache is not None else get_default_cache()
+        self.chunk_size = chunk_size
+        self.download_failures: Dict[str, str] = {}
         
-        # Downloading data grouped by columns (for easier analysis) and by ticker (for individual stock analysis)
-        # It is important to distinguish these 2 different types of downloading data, because yahoo finance API 
-        # downloads data and creates data frame with different types of multi-level index columns.
+        # Data is downloaded only once, grouped by columns, and kept as the single canonical store.
+        # Yahoo finance API creates data frames with different types of multi-level index columns depending
+        # on grouping, so both groupings are still exposed (see column_grouped_data and ticker_grouped_data),
+        # but they are derived from the same frame instead of being fetched twice.
+        self._data = self.download_data(group_by= 'column')
 
-        self.column_grouped_data = self.download_data(group_by= 'column')
-        self.ticker_grouped_data = self.download_data(group_by= 'Ticker')
+        # Everything derived from the prices is computed lazily and kept here, e.g. optimization only needs
+        # Close prices and never pays for candle features, averages or asset info
+        self._memo = {}
 
-        # Main data frame containing info about each stock. Each row is one day for one distinct asset. 
-        # This frame will be used later in feature engineering, thus it will have many columns (features).
-        self.daily_info = self.get_daily_info()
+    # TODO: make a documentation for lacking methods/attributes
 
-        # Data frame containing returns for each asset and df for historical data
-        self.daily_returns = self.get_daily_returns()
-        self.historical_data = self.get_prices(column='Close')
+    @property
+    def column_grouped_data(self):
+        """
+        Canonical data frame with multi-level columns (Price, Ticker), e.g. data['Close']['PKO.WA'].
+        """
+        return self._data
 
-    # TODO: make a documentation for lacking methods/attributes
+    @column_grouped_data.setter
+    def column_grouped_data(self, data):
+        self._data = data
+        self.invalidate()
+
+    @property
+    def ticker_grouped_data(self):
+        """
+        View of the canonical data with multi-level columns (Ticker, Price), e.g. data['PKO.WA']['Close'].
+        Only the column index is rebuilt, the underlying values are shared with column_grouped_data.
+        """
+        data = self._data.copy(deep=False)
+        data.columns = data.columns.swaplevel(0, 1).set_names(['Ticker', 'Price'])
+        return data
+
+    @property
+    def daily_info(self):
+        """
+        Main data frame containing info about each stock. Each row is one day for one distinct asset.
+        This frame will be used later in feature engineering, thus it will have many columns (features).
+        """
+        return self._memoized('daily_info', self.get_daily_info)
+
+    @property
+    def daily_returns(self):
+        """
+        Data frame containing returns for each asset.
+        """
+        return self._memoized('daily_returns', self.get_daily_returns)
+
+    @property
+    def historical_data(self):
+        """
+        Data frame with Close prices for each asset.
+        """
+        return self._memoized('historical_data', lambda: self.get_prices(column='Close'))
+
+    @property
+    def asset_info(self):
+        """
+        Result of fetching RELEVANT_INFO for the tickers. Tickers which could not be fetched are in asset_info.failures.
+        """
+        return self._memoized('asset_info', lambda: fetch_asset_info(self.tickers, RELEVANT_INFO))
+
+    def invalidate(self):
+        """
+        Drops all memoized tables, they will be recomputed from the current prices on next access.
+        """
+        self._memo.clear()
+
+    def _memoized(self, key: str, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
 
     def get_daily_returns(self):
-        return self.get_prices(column='Close').pct_change()
-    
-    
+        return calculate_returns(self.historical_data)
+
+    @instrumentation.timed('update')
+    def update(self, new_bars: Optional[pd.DataFrame] = None):
+        """
+        Appends trading days newer than the last one in the portfolio. Features of memoized returns, Close prices,
+        long data, candle features and averages are computed only for the new rows (averages through the running
+        sums of TrailingAverages), the result is the same as building a new Portfolio over the whole range.
+        daily_info itself is joined again from these parts on next access.
+
+        Only the computation is O(new rows x tickers): the prices and the memoized tables are still concatenated
+        with the new rows, which copies them, so every call also moves O(history x tickers) memory.
+
+        Args:
+            new_bars (Optional[pd.DataFrame]): New bars in the column grouped layout (Price, Ticker). If not
+                                               provided, bars after the last date are read through the price cache.
+
+        Returns:
+            pd.DataFrame: The appended bars (empty if there was nothing new).
+        """
+        last_date = self._data.index.max()
+        if new_bars is None:
+            new_bars = self.cache.get(
+                self.tickers,
+                start_date=last_date.tz_localize(None).normalize() + pd.Timedelta(days=1),
+                end_date=pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+            )
+            new_bars = new_bars.loc[new_bars.index > last_date]
+
+        unknown = set(new_bars.columns.get_level_values(1)) - set(self._data.columns.get_level_values(1))
+        if unknown:
+            raise ValueError(f"Tickers not in the portfolio: {sorted(unknown)}, build a new Portfolio instead")
+        if len(new_bars) and new_bars.index.min() <= last_date:
+            raise ValueError(f"New bars must be newer than the last date of the portfolio ({last_date})")
+        if new_bars.empty:
+            return new_bars
+
+        new_bars = new_bars.reindex(columns=self._data.columns).sort_index()
+        new_bars.index.name = self._data.index.name
+        previous_close = self._data['Close'].iloc[-1:]
+        self._data = pd.concat([self._data, new_bars])
+
+        # Extending what has been computed already, everything else is computed on next access as usual
+        memo, self._memo = self._memo, {}
+        new_close = new_bars['Close'].sort_index(ascending=False)
+        if 'historical_data' in memo:
+            self._memo['historical_data'] = pd.concat([new_close, memo['historical_data']])
+        if 'daily_returns' in memo:
+            new_returns = calculate_returns(pd.concat([previous_close, new_bars['Close']])).iloc[:-1]
+            self._memo['daily_returns'] = pd.concat([new_returns, memo['daily_returns']])
+        if 'long_data' in memo:
+            new_long_data = to_long_format(new_bars)
+            self._memo['long_data'] = pd.concat([memo['long_data'], new_long_data])
+            if 'candles' in memo:
+                self._memo['candles'] = pd.concat([memo['candles'], calculate_candle_features(new_long_data)])
+        if 'trailing_averages' in memo:
+            close_averages, volume_averages = memo['trailing_averages']
+            close_averages.append(new_bars['Close'])
+            volume_averages.append(new_bars['Volume'])
+            self._memo['trailing_averages'] = memo['trailing_averages']
+        if 'asset_info' in memo:
+            self._memo['asset_info'] = memo['asset_info']
+        return new_bars
     
-    def download_data(self, group_by: str):
+    def download_data(self, group_by: str = 'column'):
         """
-        Downloads financial data for the tickers in the portfolio using Yahoo Finance API.
+        Downloads financial data for the tickers in the portfolio using Yahoo Finance API. Data is read through
+        the price cache first, so only bars which are not cached yet are requested from Yahoo. With chunk_size
+        set, tickers are downloaded in chunks and tickers which failed are recorded in download_failures.
         
         Args:
             group_by (str): The grouping method for the data, either 'column' or 'Ticker'. It is important later
@@ -215,10 +588,29 @@ class Portfolio:
         Returns:
             pd.DataFrame: A DataFrame containing the downloaded data, grouped as requested.
         """
-        if self.use_period:
-                data = yf.download(self.tickers, group_by= group_by, period=self.period)
+        with instrumentation.stage('download_data'):
+            data = self._download(group_by)
+        if instrumentation.enabled():
+            instrumentation.count('download_data.rows', len(data))
+            instrumentation.count('download_data.bytes', int(data.memory_usage(deep=True).sum()))
+        return data
+
+    def _download(self, group_by: str):
+        dates = {'period': self.period} if self.use_period else {'start_date': self.start_date, 'end_date': self.end_date}
+        if self.chunk_size:
+            frames = []
+            self.download_failures = {}
+            for chunk in stream_prices(self.tickers, chunk_size=self.chunk_size, cache=self.cache, **dates):
+                self.download_failures.update(chunk.failures)
+                if not chunk.failed:
+                    frames.append(chunk.data)
+            if not frames:
+                raise RuntimeError(f"No chunk could be downloaded: {self.download_failures}")
+            data = pd.concat(frames, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
         else:
-            data = yf.download(self.tickers, group_by= group_by, start=self.start_date, end=self.end_date)
+            data = self.cache.get(self.tickers, **dates)
+        if group_by != 'column':
+            data.columns = data.columns.swaplevel(0, 1).set_names(['Ticker', 'Price'])
         return data
 
     def get_prices(self, column: Optional[str] = None):
@@ -234,7 +626,8 @@ class Portfolio:
         """
         if column:
             data = self.column_grouped_data[column]
-        data = self.column_grouped_data
+        else:
+            data = self.column_grouped_data
 
          # Ensure the data is in DataFrame format
         if isinstance(data, pd.Series):
@@ -250,63 +643,111 @@ class Portfolio:
         # Managing chronological order of dates
         return data.sort_values('Date', ascending=False)
     
-    def get_daily_info(self):
+    @instrumentation.timed('daily_info')
+    def get_daily_info(self, features=DAILY_INFO_FEATURES):
         """
         Calculates and returns daily information for each ticker in the portfolio, including price changes,
         daily returns, volatility, and candle patterns and  maaany more (up to 50 features)
+        Every group of features is computed only once and reused by later calls.
+
+        Args:
+            features (tuple): Groups of features to include, any of DAILY_INFO_FEATURES:
+                              'candles' (calculate_candle_features), 'averages' (calculate_averages of Close
+                              and Volume) and 'asset_info' (RELEVANT_INFO fetched from Yahoo).
         
         Returns:
-            pd.DataFrame: A DataFrame containing the daily information for each ticker.
+            pd.DataFrame: A DataFrame containing the daily information for each ticker, indexed by 'Date'.
         """
-        data = self.ticker_grouped_data
+        unknown = set(features) - set(DAILY_INFO_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown feature groups: {sorted(unknown)}")
 
-        # Handling multi-level columns in a harsh but elegant way
-        data = data.stack(level=0).rename_axis(['Date', 'Ticker']).reset_index(level=1)
+        data = self._memoized('long_data', self._get_long_data)
 
-        # Calculate daily price change, daily return, range, and volatility ratio
-        data['Change'] = data['Close'] - data['Open']
-        data['Daily Return'] = np.where(data['Open'] != 0, (data['Close'] - data['Open']) / data['Open'], np.nan)
-        data['Range'] = data['High'] - data['Low']
-        data['Volatility Ratio'] = data['Range'] / data['Open']
-        data['Upper Wick'] = data['High'] - np.maximum(data['Open'], data['Close'])
-        data['Lower Wick'] = np.minimum(data['Open'], data['Close']) - data['Low']
-        data['Candle type'] = np.where(data['Close'] > data['Open'], 1, 0)  # 1 means bullish, 0 means bearish
+        if 'candles' in features:
+            data = pd.concat([data, self._memoized('candles', lambda: calculate_candle_features(data))], axis=1)
 
         # Merge with additional asset information
         # First, calculating averages, then adding info NOT DEPENDING ON DATE!
-        data = pd.merge(data, calculate_averages(self.get_prices(), 'Close'), how='left', on='Ticker')
-        data = pd.merge(data, calculate_averages(self.get_prices(), 'Volume'), how='left', on='Ticker')
+        if 'averages' in features:
+            data = data.join(self._memoized('averages', self._get_averages), on='Ticker')
+        if 'asset_info' in features:
+            data = data.join(self.asset_info.info.set_index('Ticker'), on='Ticker')
+        return data
+
+    def get_compact_daily_info(self, features=DAILY_INFO_FEATURES) -> CompactDailyInfo:
+        """
+        Builds the same information as get_daily_info in the compact layout of CompactDailyInfo: integer ticker
+        codes, float32 prices and features, and ticker-level columns in a separate table.
 
-        data = gather_asset_info(data, RELEVANT_INFO)
+        Args:
+            features (tuple): Groups of features to include, any of DAILY_INFO_FEATURES.
+
+        Returns:
+            CompactDailyInfo: Daily fact table and ticker dimension table.
+        """
+        prices = self.column_grouped_data
+        tickers = list(dict.fromkeys(prices.columns.get_level_values(1)))
+        fields = list(dict.fromkeys(prices.columns.get_level_values(0)))
+
+        # Wide (date x ticker) arrays flattened row by row give the same order as stacking the ticker level
+        facts = pd.DataFrame(
+            {field: prices[field].reindex(columns=tickers).to_numpy(dtype=np.float32).ravel() for field in fields},
+            index=prices.index.repeat(len(tickers))
+        )
+        facts.index.name = 'Date'
+        codes = np.tile(np.arange(len(tickers)), len(prices))
+        facts.insert(0, 'Ticker', pd.Categorical.from_codes(codes, categories=tickers))
+
+        # Days without any price for a ticker are not rows of the table
+        facts = facts[facts[fields].notna().any(axis=1)]
+
+        if 'candles' in features:
+            candles = calculate_candle_features(facts)
+            candles['Candle type'] = candles['Candle type'].astype(np.int8)
+            facts = pd.concat([facts, candles], axis=1)
+
+        dimensions = pd.DataFrame(index=pd.Index(tickers, name='Ticker'))
+        if 'averages' in features:
+            dimensions = dimensions.join(self._memoized('averages', self._get_averages).astype(np.float32))
+        if 'asset_info' in features:
+            dimensions = dimensions.join(self.asset_info.info.set_index('Ticker'))
+        return CompactDailyInfo(facts, dimensions)
+
+    def _get_long_data(self):
+        with instrumentation.stage('stack'):
+            data = to_long_format(self.column_grouped_data)
+        instrumentation.count('stack.rows', len(data))
         return data
 
+    def _get_averages(self):
+        # Running sums are kept, so that update can extend the averages with new days
+        trailing = self._memoized('trailing_averages', lambda: (
+            TrailingAverages(self.historical_data, 'Close'),
+            TrailingAverages(self.get_prices('Volume'), 'Volume')
+        ))
+        return pd.concat([averages.frame().set_index('Ticker') for averages in trailing], axis=1)
 
 # ------------------------------ TESTS ----------------------------------------#
 
-# Tickers for wig20
-wig20 = [
-    "ALR.WA", "ALE.WA", "BDX.WA", "CCC.WA", "CDR.WA",
-    "CPS.WA", "DNP.WA", "KTY.WA", "JSW.WA", "KGH.WA",
-    "KRU.WA", "LPP.WA", "MBK.WA", "OPL.WA", "PEO.WA",
-    "PGE.WA", "PKN.WA", "PKO.WA", "PZU.WA", "PCO.WA"
-]
-
+# Examples, run only when the module is executed as a script (python data_gathering.py), never on import
+if __name__ == '__main__':
 
-start = datetime.datetime(2022,11,15)
-end = datetime.datetime(2025,4,4)
-period = '6y'
+    start = datetime.datetime(2022,11,15)
+    end = datetime.datetime(2025,4,4)
+    period = '6y'
 
-pft_1 = Portfolio(wig20, period = period)
-pft_2 = Portfolio(wig20, start_date= start, end_date= end)
+    pft_1 = Portfolio(WIG20, period = period)
+    pft_2 = Portfolio(WIG20, start_date= start, end_date= end)
 
-portfolios = [pft_1, pft_2]
+    portfolios = [pft_1, pft_2]
 
-for pft in portfolios:
-    print(f'{pft} tickers: {pft.tickers}')
-    print('Example showing differences between column/ticker downloading methods')
-    print(f'{pft} column grouped data downloaded from Yahoo: {pft.column_grouped_data}')
-    print(f'{pft} ticker grouped data downloaded from Yahoo: {pft.ticker_grouped_data}')
-    print('Main table for portfolio:')
-    print(pft.daily_info)
+    for pft in portfolios:
+        print(f'{pft} tickers: {pft.tickers}')
+        print('Example showing differences between column/ticker downloading methods')
+        print(f'{pft} column grouped data downloaded from Yahoo: {pft.column_grouped_data}')
+        print(f'{pft} ticker grouped data downloaded from Yahoo: {pft.ticker_grouped_data}')
+        print('Main table for portfolio:')
+        print(pft.daily_info)
 
-pft_1.daily_info.to_csv('pft1_daily_info')
\ No newline at end of file
+    pft_1.daily_info.to_csv('pft1_daily_info')
\ No newline at end of file
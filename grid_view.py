@@ -0,0 +1,87 @@
+import math
+
+import pandas as pd
+
+from typing import List, Optional, Tuple
+
+
+# Downsampling choices offered by the app, mapped to pandas resample rules
+RESAMPLE_RULES = {
+    'W': 'W-FRI',
+    'M': 'ME',
+    'Q': 'QE'
+}
+
+
+def downsample_prices(prices: pd.DataFrame, rule: Optional[str] = None, how: str = 'last') -> pd.DataFrame:
+    """
+    Aggregates daily prices into longer time buckets for an overview of a large universe.
+
+    Parameters:
+    -----------
+    prices : pandas.DataFrame
+        Prices indexed by 'Date', one column per ticker (e.g. output of gather_data).
+
+    rule : str, optional
+        Key of RESAMPLE_RULES ('W', 'M', 'Q') or any pandas resample rule. Prices are returned unchanged if not provided.
+
+    how : str
+        'last' - last price in every bucket, or
+        'ohlc' - first, highest, lowest and last price in every bucket (columns become (ticker, open/high/low/close)).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Downsampled prices with the newest dates first.
+    """
+    if not rule:
+        return prices
+    resampler = prices.sort_index().resample(RESAMPLE_RULES.get(rule, rule))
+    if how == 'last':
+        data = resampler.last()
+    elif how == 'ohlc':
+        data = resampler.ohlc()
+    else:
+        raise ValueError(f"Unknown aggregation: {how}, expected 'last' or 'ohlc'")
+    return data.dropna(how='all').sort_index(ascending=False)
+
+
+def page_of(
+        data: pd.DataFrame,
+        page: int = 1,
+        page_size: int = 50,
+        columns: Optional[List[str]] = None
+        ) -> Tuple[pd.DataFrame, int]:
+    """
+    Cuts one page of rows and the visible columns out of a price table, so that only that window is sent to the
+    browser no matter how many tickers and dates there are.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Output of downsample_prices or gather_data.
+
+    page : int
+        Number of the page, starting from 1. Values out of range are clipped.
+
+    page_size : int
+        Number of rows on a page.
+
+    columns : list, optional
+        Tickers to show, all of them if not provided.
+
+    Returns:
+    --------
+    tuple
+        The page (with flat column names, e.g. 'AAPL Close' for OHLC data) and the number of pages.
+    """
+    n_pages = max(1, math.ceil(len(data) / page_size))
+    page = min(max(1, int(page)), n_pages)
+
+    rows = data.iloc[(page - 1) * page_size:page * page_size]
+    if columns:
+        rows = rows[[column for column in columns if column in data.columns.get_level_values(0)]]
+    if isinstance(rows.columns, pd.MultiIndex):
+        rows = rows.copy()
+        rows.columns = [f'{ticker} {field.capitalize()}' for ticker, field in rows.columns]
+    return rows, n_pages
@@ -0,0 +1,184 @@
+import pandas as pd
+import numpy as np
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import squareform
+
+import instrumentation
+
+from optimization import price_fingerprint
+
+
+# Linkage trees and leaf orders of recently clustered returns, keyed by their fingerprint and the linkage method
+_LINKAGE_CACHE: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+_LINKAGE_CACHE_SIZE = 64
+
+
+def correlation_matrix(returns: pd.DataFrame) -> np.ndarray:
+    """
+    Correlation matrix of the returns. Computed with one matrix product if nothing is missing, otherwise from
+    pairwise complete observations as in pandas.
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    if np.isnan(values).any():
+        return returns.corr().to_numpy()
+    return np.corrcoef(values, rowvar=False)
+
+
+def correlation_distance(corr: np.ndarray) -> np.ndarray:
+    """
+    Condensed distance matrix sqrt((1 - corr) / 2) used for clustering (clipped, so rounding never makes it invalid).
+    """
+    distance = np.sqrt(np.clip((1.0 - corr) / 2.0, 0.0, 1.0))
+    return squareform(distance, checks=False)
+
+
+def cluster_assets(returns: pd.DataFrame, linkage_method: str = 'single') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hierarchical clustering of the assets by the correlation of their returns.
+
+    Results are memoized by the fingerprint of the returns, so repeated allocations over the same window (e.g. with
+    different covariance estimates) cluster the assets only once.
+
+    Parameters:
+    -----------
+    returns : pandas.DataFrame
+        Historical returns, one column per ticker.
+
+    linkage_method : str
+        Any method accepted by scipy.cluster.hierarchy.linkage, e.g. 'single', 'average' or 'ward'.
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        Linkage matrix and the quasi-diagonal order of the assets (positions of the columns, leaves of the tree
+        from left to right).
+    """
+    key = (price_fingerprint(returns), linkage_method)
+    if key in _LINKAGE_CACHE:
+        instrumentation.cache_access('hrp_linkage', hits=1)
+        _LINKAGE_CACHE.move_to_end(key)
+        return _LINKAGE_CACHE[key]
+    instrumentation.cache_access('hrp_linkage', misses=1)
+
+    with instrumentation.stage('hrp_linkage'):
+        linkage = hierarchy.linkage(correlation_distance(correlation_matrix(returns)), linkage_method)
+    clusters = linkage, hierarchy.leaves_list(linkage)
+    _LINKAGE_CACHE[key] = clusters
+    if len(_LINKAGE_CACHE) > _LINKAGE_CACHE_SIZE:
+        _LINKAGE_CACHE.popitem(last=False)
+    return clusters
+
+
+def recursive_bisection(cov: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    Hierarchical risk parity weights by recursive bisection of the ordered assets.
+
+    Every cluster (a contiguous range of the order) is split in halves and its weight is divided between them
+    inversely to their variances, where the variance of a cluster is that of its inverse-variance portfolio.
+    All clusters of one level of the bisection are processed at once: the variances come from a 2D cumulative
+    sum of the covariance matrix scaled by the inverse variances, so a cluster costs O(1) after an O(n^2) setup.
+
+    Parameters:
+    -----------
+    cov : numpy.ndarray
+        Covariance matrix of the assets.
+
+    order : numpy.ndarray
+        Quasi-diagonal order of the assets (see cluster_assets).
+
+    Returns:
+    --------
+    numpy.ndarray
+        Weights in the original order of the assets, summing up to 1.
+    """
+    n = len(order)
+    C = cov[np.ix_(order, order)]
+    inverse = 1 / np.diag(C)
+
+    # Variance of the inverse-variance portfolio of [a, b): sum of Q over the block / (sum of inverse variances)^2
+    Q = C * np.outer(inverse, inverse)
+    block_sums = np.zeros((n + 1, n + 1))
+    block_sums[1:, 1:] = Q.cumsum(axis=0).cumsum(axis=1)
+    inverse_sums = np.r_[0.0, np.cumsum(inverse)]
+
+    def variances(a, b):
+        total = block_sums[b, b] - block_sums[a, b] - block_sums[b, a] + block_sums[a, a]
+        return total / (inverse_sums[b] - inverse_sums[a]) ** 2
+
+    weights = np.ones(n)
+    positions = np.arange(n)
+    starts, ends = np.array([0]), np.array([n])
+    while len(starts):
+        # Only clusters with more than one asset are split, the halves are [start, middle) and [middle, end)
+        splittable = ends - starts > 1
+        starts, ends = starts[splittable], ends[splittable]
+        if not len(starts):
+            break
+        middles = starts + (ends - starts) // 2
+        left, right = variances(starts, middles), variances(middles, ends)
+        alpha = 1 - left / (left + right)
+
+        # Scaling every position by the factor of the half it belongs to, the halves of one level are disjoint
+        half_starts = np.column_stack([starts, middles]).ravel()
+        half_ends = np.column_stack([middles, ends]).ravel()
+        factors = np.column_stack([alpha, 1 - alpha]).ravel()
+        half = np.searchsorted(half_starts, positions, side='right') - 1
+        inside = (half >= 0) & (positions < half_ends[np.maximum(half, 0)])
+        weights[inside] *= factors[half[inside]]
+
+        starts, ends = half_starts, half_ends
+
+    result = np.empty(n)
+    result[order] = weights
+    return result
+
+
+def hrp_portfolio(
+        returns: pd.DataFrame,
+        cov: Optional[pd.DataFrame] = None,
+        linkage_method: str = 'single',
+        risk_free_rate: float = 0.0,
+        frequency: int = 252
+        ) -> Tuple[pd.Series, tuple]:
+    """
+    Hierarchical risk parity portfolio (Lopez de Prado), the same allocation as pypfopt's HRPOpt(returns).optimize
+    without Python loops over the clusters, so it scales to thousands of assets.
+
+    Parameters:
+    -----------
+    returns : pandas.DataFrame
+        Historical (daily) returns, one column per ticker. Used for the clustering.
+
+    cov : pandas.DataFrame, optional
+        Covariance matrix used for the bisection, the sample covariance of the returns if not provided. Changing it
+        reuses the cached clustering of the returns.
+
+    linkage_method : str
+        Linkage method of the clustering.
+
+    risk_free_rate : float
+        Risk free rate for the Sharpe ratio.
+
+    frequency : int
+        Number of periods of the returns in a year, used for annualizing the performance.
+
+    Returns:
+    --------
+    tuple
+        Weights (pandas.Series indexed by ticker) and performance (expected return, volatility, Sharpe ratio),
+        annualized from the returns.
+    """
+    tickers = list(returns.columns)
+    _, order = cluster_assets(returns, linkage_method)
+    sample_cov = returns.cov().to_numpy()
+    cov_values = sample_cov if cov is None else cov.loc[tickers, tickers].to_numpy(dtype=np.float64)
+    weights = recursive_bisection(cov_values, order)
+
+    expected_return = float(weights @ returns.mean().to_numpy() * frequency)
+    volatility = float(np.sqrt(weights @ sample_cov @ weights * frequency))
+    performance = (expected_return, volatility, (expected_return - risk_free_rate) / volatility)
+    return pd.Series(weights, index=tickers), performance
@@ -0,0 +1,219 @@
+import time
+import threading
+
+import pandas as pd
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class ProfileReport:
+    """
+    Outcome of a profiling session.
+
+    Attributes:
+        seconds (float): Wall time of the whole session.
+        stages (Dict[str, dict]): Stage name -> number of calls and total seconds. Nested stages are also counted
+                                  in the stages containing them, and stages running in parallel threads
+                                  (e.g. streamed chunks) can add up to more than the session time.
+        counters (Dict[str, float]): Counter name -> total, e.g. rows or bytes produced by a stage.
+        caches (Dict[str, dict]): Cache name -> number of hits and misses.
+    """
+    seconds: float
+    stages: Dict[str, dict] = field(default_factory=dict)
+    counters: Dict[str, float] = field(default_factory=dict)
+    caches: Dict[str, dict] = field(default_factory=dict)
+
+    def hit_rate(self, cache: str) -> Optional[float]:
+        """
+        Returns the share of hits of a cache, None if it was not used.
+        """
+        stats = self.caches.get(cache)
+        if not stats or not stats['hits'] + stats['misses']:
+            return None
+        return stats['hits'] / (stats['hits'] + stats['misses'])
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the stages as a data frame with columns Calls, Seconds and Share (of the session time), the
+        slowest stages first.
+        """
+        frame = pd.DataFrame(
+            [[stats['calls'], stats['seconds']] for stats in self.stages.values()],
+            index=list(self.stages), columns=['Calls', 'Seconds']
+        )
+        frame['Share'] = frame['Seconds'] / self.seconds if self.seconds else 0.0
+        frame.index.name = 'Stage'
+        return frame.sort_values('Seconds', ascending=False)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the report as plain (JSON serializable) types, hit rates included.
+        """
+        caches = {name: {**stats, 'hit_rate': self.hit_rate(name)} for name, stats in self.caches.items()}
+        return {'seconds': self.seconds, 'stages': self.stages, 'counters': self.counters, 'caches': caches}
+
+    def __str__(self) -> str:
+        lines = [f"Total: {self.seconds:.3f} s"]
+        for stage, row in self.to_frame().iterrows():
+            lines.append(f"  {stage:30} {int(row['Calls']):6d} calls {row['Seconds']:10.3f} s {100 * row['Share']:6.1f} %")
+        for name, value in self.counters.items():
+            lines.append(f"  {name:30} {value:,.0f}")
+        for name in self.caches:
+            lines.append(f"  {name + ' hit rate':30} {100 * self.hit_rate(name):6.1f} %"
+                         if self.hit_rate(name) is not None else f"  {name + ' hit rate':30}      -")
+        return '\n'.join(lines)
+
+
+class Profiler:
+    """
+    Collects stage timings, counters and cache hits of a profiling session. Safe to use from several threads
+    (downloads and asset info requests run in thread pools).
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+        self._caches: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._stages.setdefault(name, [0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def cache(self, name: str, hits: int = 0, misses: int = 0):
+        with self._lock:
+            stats = self._caches.setdefault(name, [0, 0])
+            stats[0] += hits
+            stats[1] += misses
+
+    def report(self) -> ProfileReport:
+        with self._lock:
+            return ProfileReport(
+                seconds=time.perf_counter() - self.started,
+                stages={name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self._stages.items()},
+                counters=dict(self._counters),
+                caches={name: {'hits': hits, 'misses': misses} for name, (hits, misses) in self._caches.items()}
+            )
+
+
+# Profilers of the running sessions, empty when profiling is off. Module functions below check it first,
+# so instrumented code only pays for one global lookup when nothing is being measured. Sessions may overlap
+# without being nested (e.g. in different threads), every record goes to all of them. The tuple is replaced,
+# never changed in place, so readers need no lock.
+_ACTIVE: Tuple[Profiler, ...] = ()
+_ACTIVE_LOCK = threading.Lock()
+_NO_STAGE = nullcontext()
+
+
+@contextmanager
+def _shared_stage(profilers: Tuple[Profiler, ...], name: str):
+    # One measurement recorded by every running session
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        for profiler in profilers:
+            profiler.add_stage(name, seconds)
+
+
+@contextmanager
+def profiling(hook: Optional[Callable[[ProfileReport], None]] = None):
+    """
+    Measures everything instrumented inside the block, in all threads. Sessions may be nested or overlap,
+    each one records everything that happens while it is running.
+
+    Usage:
+        with profiling(hook=print) as profiler:
+            portfolio = Portfolio(tickers, period='5y')
+            portfolio.daily_info
+        report = profiler.report()
+
+    Parameters:
+    -----------
+    hook : callable, optional
+        Called with the ProfileReport when the block ends, e.g. to log it or show it in the app.
+
+    Yields:
+    -------
+    Profiler
+        Collector of the session, profiler.report() can also be called inside the block.
+    """
+    global _ACTIVE
+    profiler = Profiler()
+    with _ACTIVE_LOCK:
+        _ACTIVE = _ACTIVE + (profiler,)
+    try:
+        yield profiler
+    finally:
+        # Only this session is removed, others may have started or ended in the meantime
+        with _ACTIVE_LOCK:
+            _ACTIVE = tuple(active for active in _ACTIVE if active is not profiler)
+        if hook is not None:
+            hook(profiler.report())
+
+
+def enabled() -> bool:
+    """
+    Whether a profiling session is running, for counters which are costly to compute (e.g. memory usage).
+    """
+    return bool(_ACTIVE)
+
+
+def stage(name: str):
+    """
+    Context manager timing a stage of the pipeline, a shared no-op one when profiling is off.
+    """
+    profilers = _ACTIVE
+    if not profilers:
+        return _NO_STAGE
+    return profilers[0].stage(name) if len(profilers) == 1 else _shared_stage(profilers, name)
+
+
+def count(name: str, value: float = 1):
+    """
+    Adds value to a counter, e.g. the number of rows or bytes produced by a stage.
+    """
+    for profiler in _ACTIVE:
+        profiler.count(name, value)
+
+
+def cache_access(name: str, hits: int = 0, misses: int = 0):
+    """
+    Records hits and misses of a cache.
+    """
+    for profiler in _ACTIVE:
+        profiler.cache(name, hits, misses)
+
+
+def timed(name: str):
+    """
+    Decorator timing every call of a function as a stage.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _ACTIVE:
+                return function(*args, **kwargs)
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
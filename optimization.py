@@ -1,29 +1,479 @@
+import hashlib
+
 import pandas as pd
 import numpy as np
 
-from pypfopt.expected_returns import mean_historical_return
-from pypfopt.risk_models import CovarianceShrinkage
-from pypfopt.efficient_frontier import EfficientFrontier
-from pypfopt.discrete_allocation import DiscreteAllocation, get_latest_prices
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import instrumentation
 
+from allocation import AllocationResult, allocate, latest_prices
 from data_gathering import Portfolio
 
+# pypfopt and cvxpy take seconds to import, so they are imported inside the functions using them
+
+
+# Methods accepted by PortfolioOptimization.optimize
+METHODS = ('MV', 'HRP', 'min_volatility', 'efficient_risk')
+
+# Options of solve_weights passed to the EfficientFrontier constructor, the rest go to the method's solver call
+_FRONTIER_OPTIONS = ('weight_bounds', 'solver', 'verbose', 'solver_options')
+
+# Estimates of expected returns and covariance matrix for recently used price data, keyed by its fingerprint
+_ESTIMATES_CACHE: "OrderedDict[str, Tuple[pd.Series, pd.DataFrame]]" = OrderedDict()
+_ESTIMATES_CACHE_SIZE = 32
+
+
+def price_fingerprint(prices: pd.DataFrame) -> str:
+    """
+    Returns a hash identifying the price data (values, dates and tickers).
+    """
+    row_hashes = pd.util.hash_pandas_object(prices, index=True).to_numpy()
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(repr(list(prices.columns)).encode())
+    return digest.hexdigest()
+
+
+def estimate_returns_and_covariance(prices: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Estimates expected returns (mean historical return) and the Ledoit-Wolf shrunk covariance matrix of the prices.
+    Results are memoized by the fingerprint of the prices, so the same data is estimated only once.
+
+    Parameters:
+    -----------
+    prices : pandas.DataFrame
+        Prices in chronological order, one column per ticker.
+
+    Returns:
+    --------
+    tuple
+        Expected returns (notation: mu) and covariance matrix (notation: S).
+    """
+    key = price_fingerprint(prices)
+    if key in _ESTIMATES_CACHE:
+        instrumentation.cache_access('estimates', hits=1)
+        _ESTIMATES_CACHE.move_to_end(key)
+        return _ESTIMATES_CACHE[key]
+    instrumentation.cache_access('estimates', misses=1)
+
+    from pypfopt.expected_returns import mean_historical_return
+    from pypfopt.risk_models import CovarianceShrinkage
+
+    with instrumentation.stage('estimate'):
+        estimates = mean_historical_return(prices), CovarianceShrinkage(prices).ledoit_wolf()
+    _ESTIMATES_CACHE[key] = estimates
+    if len(_ESTIMATES_CACHE) > _ESTIMATES_CACHE_SIZE:
+        _ESTIMATES_CACHE.popitem(last=False)
+    return estimates
+
+
+def solve_weights(mu: pd.Series, S: pd.DataFrame, method: str = 'MV', returns: Optional[pd.DataFrame] = None,
+                  risk_free_rate: float = 0.0, **kwargs) -> Tuple[Dict[str, float], tuple]:
+    """
+    Solves for portfolio weights with already estimated expected returns and covariance matrix.
+
+    Parameters:
+    -----------
+    mu : pandas.Series
+        Expected returns.
+
+    S : pandas.DataFrame
+        Covariance matrix.
+
+    method : str
+        One of METHODS: 'MV' (maximal Sharpe ratio), 'HRP' (hierarchical risk parity, needs returns),
+        'min_volatility' or 'efficient_risk' (maximal return for target_volatility given in kwargs).
+
+    returns : pandas.DataFrame, optional
+        Historical returns, required by 'HRP'.
+
+    risk_free_rate : float
+        Risk free rate for the Sharpe ratio.
+
+    kwargs
+        weight_bounds, solver, verbose and solver_options are passed to EfficientFrontier, other options to the
+        solver of the method, e.g. target_volatility for 'efficient_risk' or linkage_method for 'HRP'. Options the
+        method does not accept raise TypeError.
+
+    Returns:
+    --------
+    tuple
+        Cleaned weights (dictionary ticker -> weight) and performance (expected return, volatility, Sharpe ratio).
+    """
+    if method == 'HRP':
+        if returns is None:
+            raise ValueError("Method 'HRP' needs historical returns")
+        # Vectorized HRP with clustering cached per returns window (hrp.py imports this module, hence imported here)
+        from hrp import hrp_portfolio
+
+        weights, performance = hrp_portfolio(returns, risk_free_rate=risk_free_rate, **kwargs)
+        return weights.to_dict(), performance
+
+    from pypfopt.efficient_frontier import EfficientFrontier
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}, expected one of {METHODS}")
+    options = {key: kwargs.pop(key) for key in _FRONTIER_OPTIONS if key in kwargs}
+    ef = EfficientFrontier(mu, S, **options)
+    if method == 'MV':
+        ef.max_sharpe(risk_free_rate=risk_free_rate, **kwargs)
+    elif method == 'min_volatility':
+        ef.min_volatility(**kwargs)
+    else:
+        ef.efficient_risk(**kwargs)
+    cleaned_weights = ef.clean_weights() # extremely small weights are rounded to 0; is a dictionary -> ticker: weight
+    return dict(cleaned_weights), ef.portfolio_performance(risk_free_rate=risk_free_rate)
+
+
+def _simulate_chunk(mu: np.ndarray, S: np.ndarray, size: int, seed: np.random.SeedSequence,
+                    risk_free_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draws one batch of random long-only portfolios and returns their weights and (return, volatility, sharpe) points.
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.random((size, len(mu)))
+    weights /= weights.sum(axis=1, keepdims=True)  # normalization - ensuring that all weights sum up to 1
+
+    returns = weights @ mu
+    # w^T S w for every row at once, the covariance matrix is used as it is, without recomputing
+    volatility = np.sqrt(np.einsum('ij,jk,ik->i', weights, S, weights, optimize=True))
+    sharpe = (returns - risk_free_rate) / volatility
+    return weights, np.column_stack([returns, volatility, sharpe])
+
+
+def iter_random_portfolios(
+        mu: np.ndarray,
+        S: np.ndarray,
+        n_portfolios: int,
+        chunk_size: int = 100_000,
+        risk_free_rate: float = 0.0,
+        seed: Optional[int] = None,
+        n_jobs: int = 1
+        ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Monte Carlo simulation of random portfolios, generated in chunks so that memory does not grow with n_portfolios.
+
+    Every chunk has its own random stream spawned from the seed, so the results are the same for any n_jobs.
+
+    Parameters:
+    -----------
+    mu : numpy.ndarray
+        Expected (annual) returns of the assets.
+
+    S : numpy.ndarray
+        Covariance matrix of the (annual) returns.
+
+    n_portfolios : int
+        Number of portfolios to draw.
+
+    chunk_size : int
+        Number of portfolios drawn at once.
+
+    risk_free_rate : float
+        Risk free rate used for the Sharpe ratio.
+
+    seed : int, optional
+        Seed of the random generator.
+
+    n_jobs : int
+        Number of processes drawing the chunks. With 1 everything runs in the current process.
+
+    Yields:
+    -------
+    tuple of numpy.ndarray
+        Weights of the chunk (chunk_size x n_assets) and its points (chunk_size x 3: return, volatility, sharpe).
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    S = np.asarray(S, dtype=np.float64)
+    sizes = [min(chunk_size, n_portfolios - start) for start in range(0, n_portfolios, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if n_jobs == 1:
+        for size, chunk_seed in zip(sizes, seeds):
+            yield _simulate_chunk(mu, S, size, chunk_seed, risk_free_rate)
+        return
+
+    # Only a few chunks are in flight at once, finished ones are yielded in order and then dropped
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = deque()
+        for size, chunk_seed in zip(sizes, seeds):
+            pending.append(executor.submit(_simulate_chunk, mu, S, size, chunk_seed, risk_free_rate))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+@dataclass
+class MonteCarloResult:
+    """
+    Summary of a Monte Carlo simulation.
+
+    Attributes:
+        points (Optional[pd.DataFrame]): Return, Volatility and Sharpe of every portfolio, None if they were not kept.
+        max_sharpe_weights (Dict[str, float]): Weights of the portfolio with the highest Sharpe ratio.
+        min_volatility_weights (Dict[str, float]): Weights of the portfolio with the lowest volatility.
+        max_sharpe (float): The highest Sharpe ratio.
+        min_volatility (float): The lowest volatility.
+    """
+    points: Optional[pd.DataFrame]
+    max_sharpe_weights: Dict[str, float]
+    min_volatility_weights: Dict[str, float]
+    max_sharpe: float
+    min_volatility: float
 
         
-class PortfolioOptimization(Portfolio):
-    def __init__(self):
-        self.expected_returns = mean_historical_return(self.historical_data) # notation: mu
-        self.covariance_matrix = CovarianceShrinkage(self.historical_data).ledoit_wolf() # notation: S
+@dataclass
+class FrontierResult:
+    """
+    Points of the mean-variance efficient frontier.
+
+    Attributes:
+        points (np.ndarray): Array (n_points x 4) with columns: target, expected return, volatility, Sharpe ratio.
+                             Rows of points which could not be solved are NaN.
+        weights (np.ndarray): Array (n_points x n_assets) with weights of every point.
+        tickers (List[str]): Names of the assets, in the order of the weights columns.
+    """
+    points: np.ndarray
+    weights: np.ndarray
+    tickers: List[str]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the points as a data frame with columns Target, Return, Volatility and Sharpe.
+        """
+        return pd.DataFrame(self.points, columns=['Target', 'Return', 'Volatility', 'Sharpe'])
+
+
+@instrumentation.timed('efficient_frontier')
+def efficient_frontier(
+        mu: pd.Series,
+        S: pd.DataFrame,
+        n_points: int = 100,
+        target: str = 'return',
+        weight_bounds: Tuple[float, float] = (0, 1),
+        risk_free_rate: float = 0.0,
+        solver: Optional[str] = 'CLARABEL'
+        ) -> FrontierResult:
+    """
+    Sweeps the mean-variance efficient frontier from the minimal volatility portfolio to the maximal return one.
+
+    One optimization problem with the target as a cvxpy parameter is built for the whole sweep. Only the parameter
+    value changes between the points, so the problem is compiled once and every solve is warm started from the
+    previous point.
+
+    Parameters:
+    -----------
+    mu : pandas.Series
+        Expected returns.
+
+    S : pandas.DataFrame
+        Covariance matrix.
+
+    n_points : int
+        Number of points of the frontier.
+
+    target : str
+        'return' - minimal volatility for evenly spaced target returns, or
+        'risk' - maximal return for evenly spaced target volatilities.
+
+    weight_bounds : tuple
+        Minimal and maximal weight of a single asset.
+
+    risk_free_rate : float
+        Risk free rate used for the Sharpe ratio.
+
+    solver : str, optional
+        Name of the cvxpy solver. Clarabel (installed with cvxpy) handles both kinds of targets reliably,
+        with None cvxpy chooses the solver itself.
+
+    Returns:
+    --------
+    FrontierResult
+        Points and weights of the frontier.
+    """
+    import cvxpy as cp
+
+    if target not in ('return', 'risk'):
+        raise ValueError(f"Unknown target: {target}, expected 'return' or 'risk'")
+    tickers = list(mu.index)
+    mu_values = mu.to_numpy(dtype=np.float64)
+    S_values = S.loc[tickers, tickers].to_numpy(dtype=np.float64)
+
+    w = cp.Variable(len(tickers))
+    variance = cp.quad_form(w, cp.psd_wrap(S_values))
+    constraints = [cp.sum(w) == 1, w >= weight_bounds[0], w <= weight_bounds[1]]
+    parameter = cp.Parameter()
+
+    # The sweep goes from the minimal volatility portfolio (the 'return' problem with an inactive target)
+    # to the maximal return one (a linear problem)
+    min_return = cp.Problem(cp.Minimize(variance), constraints + [mu_values @ w >= parameter])
+    parameter.value = float(mu_values.min()) - 1.0
+    min_return.solve(solver=solver)
+    w_start = w.value
+    cp.Problem(cp.Maximize(mu_values @ w), constraints).solve(solver=solver)
+    w_end = w.value
+
+    # Targets are kept slightly inside the range, the end points are only feasible up to the solver tolerance
+    if target == 'return':
+        problem = min_return
+        bounds = mu_values @ w_start, mu_values @ w_end
+    else:
+        problem = cp.Problem(cp.Maximize(mu_values @ w), constraints + [variance <= parameter])
+        bounds = np.sqrt(w_start @ S_values @ w_start), np.sqrt(w_end @ S_values @ w_end)
+    margin = 1e-6 * (bounds[1] - bounds[0])
+    targets = np.linspace(bounds[0] + margin, bounds[1] - margin, n_points)
 
-    def optimize(self, method='MV'):
+    points = np.full((n_points, 4), np.nan)
+    weights = np.full((n_points, len(tickers)), np.nan)
+    for i, value in enumerate(targets):
+        parameter.value = float(value) if target == 'return' else float(value) ** 2
+        try:
+            problem.solve(solver=solver, warm_start=True)
+        except cp.error.SolverError:
+            continue
+        if w.value is None or problem.status not in ('optimal', 'optimal_inaccurate'):
+            continue
+        weights[i] = w.value
+        expected_return = mu_values @ w.value
+        volatility = np.sqrt(max(w.value @ S_values @ w.value, 0.0))
+        points[i] = value, expected_return, volatility, (expected_return - risk_free_rate) / volatility
+
+    return FrontierResult(points=points, weights=weights, tickers=tickers)
+
+
+class PortfolioOptimization:
+    """
+    Portfolio optimization on historical Close prices.
+
+    Expected returns and the covariance matrix are estimated once on construction (and memoized across instances
+    built on the same prices), so switching between optimization methods only costs the solve.
+
+    Parameters:
+    -----------
+    data : Portfolio or pandas.DataFrame
+        Portfolio whose historical_data is used, or a price matrix (dates x tickers).
+    """
+    def __init__(self, data: Union[Portfolio, pd.DataFrame]):
+        prices = data.historical_data if isinstance(data, Portfolio) else data
+        # Chronological order is needed for returns, Portfolio keeps the newest dates first
+        self.historical_data = prices.sort_index()
+        self.expected_returns, self.covariance_matrix = estimate_returns_and_covariance(self.historical_data) # notation: mu, S
+        self._returns = None
+        self.performance = None
+
+    @property
+    def returns(self):
+        """
+        Daily returns of the historical data.
+        """
+        if self._returns is None:
+            self._returns = self.historical_data.pct_change().dropna(how='all')
+        return self._returns
+
+    def optimize(self, method='MV', **kwargs):
+        """
+        Calculates weights of the portfolio.
+
+        Args:
+            method (str): One of METHODS: 'MV', 'HRP', 'min_volatility' or 'efficient_risk'.
+            kwargs: Passed to solve_weights, e.g. risk_free_rate, weight_bounds or target_volatility (required by
+                'efficient_risk').
+
+        Returns:
+            dict: Cleaned weights, ticker -> weight. Performance of the portfolio (expected return, volatility,
+                  Sharpe ratio) is stored in self.performance.
+        """
         mu = self.expected_returns
         S = self.covariance_matrix
-        if method == 'MV':
-            ef = EfficientFrontier(mu, S)
-            weights = ef.max_sharpe()  # ugly version of weights
-            cleaned_weights = ef.clean_weights() # extremely small weights are rounded to 0; is a dictionary -> ticker: weight
-            performance = ef.portfolio_performance(verbose=True)
+        with instrumentation.stage(f'optimize.{method}'):
+            cleaned_weights, self.performance = solve_weights(mu, S, method, returns=self.returns, **kwargs)
         return cleaned_weights
+
+    def allocate(self, weights, budgets, method: str = 'greedy') -> AllocationResult:
+        """
+        Converts weights into numbers of shares at the latest prices of the historical data (see allocation.allocate).
+
+        Args:
+            weights: Weight sets, e.g. {'MV': self.optimize('MV'), 'HRP': self.optimize('HRP')}.
+            budgets: Total portfolio value or a list of them.
+            method (str): 'greedy' (the same shares as DiscreteAllocation.greedy_portfolio) or 'rounding' (faster).
+
+        Returns:
+            AllocationResult: Shares and leftover cash for every weight set and budget.
+        """
+        return allocate(weights, latest_prices(self.historical_data), budgets, method=method)
+
+    def frontier(self, n_points: int = 100, target: str = 'return', **kwargs) -> FrontierResult:
+        """
+        Calculates the whole efficient frontier instead of a single optimal portfolio (see efficient_frontier).
+
+        Args:
+            n_points (int): Number of points of the frontier.
+            target (str): 'return' (target returns) or 'risk' (target volatilities).
+            kwargs: Passed to efficient_frontier, e.g. weight_bounds or risk_free_rate.
+
+        Returns:
+            FrontierResult: Points and weights of the frontier.
+        """
+        return efficient_frontier(self.expected_returns, self.covariance_matrix, n_points=n_points, target=target, **kwargs)
+
+    def monte_carlo(
+            self,
+            n_portfolios: int = 1_000_000,
+            chunk_size: int = 100_000,
+            risk_free_rate: float = 0.0,
+            seed: Optional[int] = None,
+            n_jobs: int = 1,
+            keep_points: bool = True
+            ) -> MonteCarloResult:
+        """
+        Monte Carlo alternative to optimize: draws random long-only portfolios and keeps the best ones. Expected
+        returns and the covariance matrix are the same as in optimize and are computed only once.
+
+        Args:
+            n_portfolios (int): Number of portfolios to draw.
+            chunk_size (int): Number of portfolios drawn at once, only one chunk of weights is held in memory.
+            risk_free_rate (float): Risk free rate used for the Sharpe ratio.
+            seed (Optional[int]): Seed of the random generator.
+            n_jobs (int): Number of processes drawing the chunks.
+            keep_points (bool): Whether to return (return, volatility, sharpe) of every portfolio, e.g. for plotting
+                                the frontier. Only the best portfolios are kept otherwise.
+
+        Returns:
+            MonteCarloResult: Best portfolios and, optionally, all simulated points.
+        """
+        if n_portfolios < 1:
+            raise ValueError(f"n_portfolios must be at least 1, got {n_portfolios}")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        tickers = list(self.expected_returns.index)
+        points = []
+        best_sharpe, best_sharpe_weights = -np.inf, None
+        best_volatility, best_volatility_weights = np.inf, None
+
+        for weights, chunk_points in iter_random_portfolios(
+                self.expected_returns.to_numpy(), self.covariance_matrix.to_numpy(), n_portfolios,
+                chunk_size=chunk_size, risk_free_rate=risk_free_rate, seed=seed, n_jobs=n_jobs):
+            i = np.argmax(chunk_points[:, 2])
+            if chunk_points[i, 2] > best_sharpe:
+                best_sharpe, best_sharpe_weights = chunk_points[i, 2], weights[i]
+            j = np.argmin(chunk_points[:, 1])
+            if chunk_points[j, 1] < best_volatility:
+                best_volatility, best_volatility_weights = chunk_points[j, 1], weights[j]
+            if keep_points:
+                points.append(chunk_points.astype(np.float32))
+
+        return MonteCarloResult(
+            points=pd.DataFrame(np.concatenate(points), columns=['Return', 'Volatility', 'Sharpe']) if keep_points else None,
+            max_sharpe_weights=dict(zip(tickers, best_sharpe_weights)),
+            min_volatility_weights=dict(zip(tickers, best_volatility_weights)),
+            max_sharpe=float(best_sharpe),
+            min_volatility=float(best_volatility)
+        )
     
 
  
@@ -0,0 +1,97 @@
+import time
+import asyncio
+import threading
+
+import pandas as pd
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import instrumentation
+
+from data_cache import PriceCache
+from yf_data_gathering import gather_data
+
+
+class PriceService:
+    """
+    Price data shared by all sessions of the app.
+
+    Requests are identified by the set of tickers and the dates (or period). Identical requests which arrive while
+    a download is running wait for that download instead of starting their own, finished frames are kept for
+    ttl seconds, and downloads run in a small thread pool, so the event loop serving the sessions is never blocked.
+
+    Parameters:
+    -----------
+    cache : PriceCache, optional
+        On-disk price cache passed to gather_data, the default cache if not provided.
+
+    max_workers : int
+        Maximal number of downloads running at the same time.
+
+    max_entries : int
+        Number of finished frames kept in memory.
+
+    ttl : float
+        Time (in seconds) after which a finished frame is downloaded again.
+    """
+    def __init__(self, cache: Optional[PriceCache] = None, max_workers: int = 4, max_entries: int = 32, ttl: float = 900):
+        self.cache = cache
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prices')
+        self._lock = threading.Lock()
+        self._frames: "OrderedDict[tuple, Tuple[float, pd.DataFrame]]" = OrderedDict()
+        self._in_flight: Dict[tuple, Future] = {}
+
+    @staticmethod
+    def request_key(tickers: List[str], start_date=None, end_date=None, period: str = '1y') -> tuple:
+        dates = (str(start_date), str(end_date)) if start_date and end_date else (period,)
+        return (tuple(sorted(set(tickers))),) + dates
+
+    def submit(self, tickers: List[str], start_date=None, end_date=None, period: str = '1y') -> Future:
+        """
+        Returns a future with Close prices of the tickers (see gather_data). The future is already finished if the
+        frame is in memory, and shared with other callers if the same request is being downloaded.
+        """
+        key = self.request_key(tickers, start_date, end_date, period)
+        with self._lock:
+            if key in self._frames:
+                stored_at, frame = self._frames[key]
+                if time.monotonic() - stored_at <= self.ttl:
+                    instrumentation.cache_access('price_service', hits=1)
+                    self._frames.move_to_end(key)
+                    future = Future()
+                    future.set_result(frame)
+                    return future
+                del self._frames[key]
+
+            if key in self._in_flight:
+                # Joining a running download counts as a hit, nothing new is downloaded
+                instrumentation.cache_access('price_service', hits=1)
+                return self._in_flight[key]
+            instrumentation.cache_access('price_service', misses=1)
+
+            future = self._executor.submit(
+                gather_data, list(key[0]), start_date=start_date, end_date=end_date, period=period, cache=self.cache
+            )
+            self._in_flight[key] = future
+        future.add_done_callback(lambda finished: self._finish(key, finished))
+        return future
+
+    async def get(self, tickers: List[str], start_date=None, end_date=None, period: str = '1y') -> pd.DataFrame:
+        """
+        Awaitable version of submit, returns the prices with columns in the order of the given tickers.
+        """
+        frame = await asyncio.wrap_future(self.submit(tickers, start_date, end_date, period))
+        return frame[[ticker for ticker in dict.fromkeys(tickers) if ticker in frame.columns]]
+
+    def _finish(self, key: tuple, future: Future):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._frames[key] = (time.monotonic(), future.result())
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
@@ -0,0 +1,241 @@
+"""
+Prebuilt price snapshots of the predefined universes, loaded by the app without touching the network.
+
+Usage:
+    python price_snapshot.py build WIG20 FTSE100 --period 5y
+    python price_snapshot.py refresh SP500
+"""
+import os
+import json
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List, Optional
+
+from data_cache import PriceCache, get_default_cache, resolve_dates
+from universes import UNIVERSES, get_universe
+
+# Version of the on-disk layout, snapshots written in a different layout are ignored (and should be rebuilt)
+SNAPSHOT_FORMAT = 1
+
+_LOADED: Dict[str, tuple] = {}
+_LOCK = threading.Lock()
+
+
+def default_directory() -> str:
+    """
+    Directory of the snapshots, 'snapshots' next to this file unless set with the PRICE_SNAPSHOT_DIR environment variable.
+    """
+    return os.environ.get('PRICE_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+
+
+def _path(name: str, directory: Optional[str]) -> str:
+    # Snapshots of ticker files are named after the file, e.g. 'wig20' for 'data/wig20.txt'
+    if name not in UNIVERSES:
+        name = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(directory or default_directory(), name)
+
+
+def write_snapshot(name: str, prices: pd.DataFrame, covered_from: pd.Timestamp, directory: Optional[str] = None):
+    """
+    Stores Close prices of a universe as a snapshot.
+
+    The snapshot is a directory with 'dates.npy' (int64 timestamps), 'close.npy' (float64 matrix, dates x tickers)
+    and 'meta.json' (format version, tickers, covered range and build time). Both arrays are plain .npy files,
+    so loading them is a memory map instead of parsing.
+
+    Parameters:
+    -----------
+    name : str
+        Name of the universe, e.g. 'WIG20'.
+
+    prices : pandas.DataFrame
+        Close prices indexed by date, one column per ticker (output of gather_data).
+
+    covered_from : pandas.Timestamp
+        Start of the requested range, the snapshot answers requests starting at this date or later.
+
+    directory : str, optional
+        Root directory of the snapshots, default_directory() if not provided.
+    """
+    path = _path(name, directory)
+    os.makedirs(path, exist_ok=True)
+    prices = prices.sort_index()
+
+    # Writing to temporary files first, so an interrupted build never leaves a half-written snapshot
+    arrays = {
+        'dates.npy': prices.index.values.astype('datetime64[ns]').astype(np.int64),
+        'close.npy': np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+    }
+    for file_name, array in arrays.items():
+        with open(os.path.join(path, file_name + '.tmp'), 'wb') as f:
+            np.save(f, array)
+        os.replace(os.path.join(path, file_name + '.tmp'), os.path.join(path, file_name))
+
+    meta = {
+        'format': SNAPSHOT_FORMAT,
+        'tickers': [str(ticker) for ticker in prices.columns],
+        'covered_from': pd.Timestamp(covered_from).isoformat(),
+        'last_date': prices.index[-1].isoformat() if len(prices) else None,
+        'built_at': pd.Timestamp.now().isoformat(timespec='seconds')
+    }
+    with open(os.path.join(path, 'meta.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(os.path.join(path, 'meta.json.tmp'), os.path.join(path, 'meta.json'))
+
+
+def load_snapshot(name: str, directory: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Returns the snapshot of a universe as Close prices indexed by 'Date' (newest first, like gather_data), or None
+    if there is no snapshot in the current format. Loaded snapshots are kept in memory until their files change.
+    """
+    meta_path = os.path.join(_path(name, directory), 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    key = os.path.abspath(meta_path)
+    modified = os.path.getmtime(meta_path)
+    with _LOCK:
+        if key in _LOADED and _LOADED[key][0] == modified:
+            return _LOADED[key][1]
+
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format') != SNAPSHOT_FORMAT:
+        return None
+    path = os.path.dirname(meta_path)
+    dates = np.load(os.path.join(path, 'dates.npy'), mmap_mode='r')
+    close = np.load(os.path.join(path, 'close.npy'), mmap_mode='r')
+
+    # Reversed views of the memory maps, the newest dates come first without copying the matrix
+    prices = pd.DataFrame(
+        close[::-1],
+        index=pd.DatetimeIndex(dates[::-1].astype('datetime64[ns]'), name='Date'),
+        columns=pd.Index(meta['tickers'], name='Ticker'),
+        copy=False
+    )
+    prices.attrs['covered_from'] = pd.Timestamp(meta['covered_from'])
+    with _LOCK:
+        _LOADED[key] = (modified, prices)
+    return prices
+
+
+def snapshot_prices(
+        name: str,
+        start_date=None,
+        end_date=None,
+        period: str = '1y',
+        directory: Optional[str] = None
+        ) -> Optional[pd.DataFrame]:
+    """
+    Answers a gather_data style request from the snapshot of a universe.
+
+    Returns None if there is no snapshot or it starts after the requested range, in which case the prices have to
+    be downloaded. A snapshot which has not been refreshed recently simply ends at its last date.
+    """
+    prices = load_snapshot(name, directory)
+    if prices is None:
+        return None
+    start, end = resolve_dates(start_date, end_date, period)
+    if start < prices.attrs['covered_from']:
+        return None
+    return prices.loc[(prices.index >= start) & (prices.index < end)]
+
+
+def _close_prices(cache: PriceCache, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    data = cache.get(tickers, start_date=start, end_date=end)['Close']
+    return data.tz_localize(None) if data.index.tz is not None else data
+
+
+def build_snapshot(
+        name: str,
+        period: str = '5y',
+        cache: Optional[PriceCache] = None,
+        directory: Optional[str] = None
+        ) -> pd.DataFrame:
+    """
+    Builds the snapshot of a universe from scratch, downloading missing prices through the price cache.
+
+    Parameters:
+    -----------
+    name : str
+        Name of a universe from universes.UNIVERSES (or a path to a ticker file).
+
+    period : str
+        yfinance period covered by the snapshot.
+
+    cache : PriceCache, optional
+        Price cache used for downloading, the default cache if not provided.
+
+    directory : str, optional
+        Root directory of the snapshots.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Close prices stored in the snapshot.
+    """
+    cache = cache if cache is not None else get_default_cache()
+    start, end = resolve_dates(period=period)
+    prices = _close_prices(cache, get_universe(name), start, end)
+    write_snapshot(name, prices, start, directory)
+    return prices
+
+
+def refresh_snapshot(
+        name: str,
+        period: str = '5y',
+        cache: Optional[PriceCache] = None,
+        directory: Optional[str] = None
+        ) -> pd.DataFrame:
+    """
+    Tops up the snapshot of a universe with the bars after its last date. Tickers which joined the universe are
+    downloaded over the whole covered range, tickers which left it are dropped. Builds the snapshot (covering the
+    period) if there is none yet.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Close prices stored in the snapshot.
+    """
+    existing = load_snapshot(name, directory)
+    if existing is None or existing.empty:
+        return build_snapshot(name, period, cache, directory)
+    cache = cache if cache is not None else get_default_cache()
+
+    tickers = get_universe(name)
+    covered_from = existing.attrs['covered_from']
+    _, end = resolve_dates(period=period)
+    old = existing.sort_index()[[ticker for ticker in tickers if ticker in existing.columns]]
+
+    # The last stored bar is downloaded again, it may have been taken before the session closed
+    parts = [old, _close_prices(cache, list(old.columns), old.index[-1], end)]
+    joined = [ticker for ticker in tickers if ticker not in existing.columns]
+    if joined:
+        parts.append(_close_prices(cache, joined, covered_from, end))
+
+    prices = pd.concat(parts[:2])
+    prices = prices[~prices.index.duplicated(keep='last')]
+    if joined:
+        prices = prices.join(parts[2], how='outer')
+    prices = prices.sort_index()[[ticker for ticker in tickers if ticker in prices.columns]]
+    write_snapshot(name, prices, covered_from, directory)
+    return prices
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build', 'refresh'])
+    parser.add_argument('universes', nargs='*', default=list(UNIVERSES),
+                        help='Names of universes or paths to ticker files, all predefined universes by default')
+    parser.add_argument('--period', default='5y', help='Period covered by a new snapshot')
+    parser.add_argument('--directory', default=None, help='Root directory of the snapshots')
+    args = parser.parse_args()
+
+    for universe in args.universes:
+        action = build_snapshot if args.command == 'build' else refresh_snapshot
+        prices = action(universe, period=args.period, directory=args.directory)
+        print(f"{universe}: {prices.shape[1]} tickers, {len(prices)} dates "
+              f"({prices.index[0].date()} - {prices.index[-1].date()})")
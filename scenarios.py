@@ -0,0 +1,253 @@
+"""
+Evaluation of many portfolio scenarios (universe, date range, optimization method) at once.
+
+Prices are downloaded once per distinct date range for all tickers of its scenarios and placed in shared
+memory. Worker processes read them from there instead of receiving pickled data frames, and every worker
+task estimates returns and covariance once for all methods of the same (tickers, dates) pair.
+
+Usage:
+    results = run_scenarios([
+        Scenario('WIG20', method='MV', period='5y'),
+        Scenario('WIG20', method='HRP', period='5y'),
+        Scenario(['PKO.WA', 'PZU.WA', 'KGH.WA'], method='min_volatility', start_date='2020-01-01', end_date='2024-01-01')
+    ], n_jobs=4)
+    results.performance
+    results.weights_table()
+"""
+import pandas as pd
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple, Union
+
+import instrumentation
+
+from data_cache import PriceCache, get_default_cache, resolve_dates
+from data_gathering import Portfolio
+from optimization import METHODS, PortfolioOptimization
+from universes import get_universe
+
+
+@dataclass
+class Scenario:
+    """
+    One portfolio to evaluate.
+
+    Attributes:
+        tickers (Union[str, List[str]]): List of tickers, or the name of a universe (see universes.get_universe).
+        method (str): Optimization method, one of optimization.METHODS.
+        start_date, end_date (Optional): Explicit date range, used if both are given.
+        period (str): yfinance period used when the dates are not given.
+        options (dict): Passed to PortfolioOptimization.optimize, e.g. {'target_volatility': 0.2}.
+        name (Optional[str]): Label of the scenario in the results, derived from the other fields if not given.
+    """
+    tickers: Union[str, List[str]]
+    method: str = 'MV'
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    period: str = '1y'
+    options: dict = field(default_factory=dict)
+    name: Optional[str] = None
+
+    @property
+    def ticker_list(self) -> List[str]:
+        return get_universe(self.tickers) if isinstance(self.tickers, str) else list(dict.fromkeys(self.tickers))
+
+    @property
+    def dates(self) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        return resolve_dates(self.start_date, self.end_date, self.period)
+
+    @property
+    def label(self) -> str:
+        if self.name:
+            return self.name
+        universe = self.tickers if isinstance(self.tickers, str) else f'{len(self.tickers)} tickers'
+        dates = f'{pd.Timestamp(self.start_date):%Y-%m-%d}..{pd.Timestamp(self.end_date):%Y-%m-%d}' \
+            if self.start_date and self.end_date else self.period
+        return f'{universe} {dates} {self.method}'
+
+
+@dataclass
+class SharedPrices:
+    """
+    Price matrix (dates x tickers, float64) placed in a shared memory block. Only this small description is
+    sent to worker processes, which map the block instead of unpickling a copy of the prices.
+
+    Attributes:
+        name (str): Name of the shared memory block.
+        index (pd.DatetimeIndex): Dates, the rows of the matrix.
+        tickers (List[str]): Tickers, the columns of the matrix.
+    """
+    name: str
+    index: pd.DatetimeIndex
+    tickers: List[str]
+
+    @classmethod
+    def create(cls, prices: pd.DataFrame) -> Tuple['SharedPrices', SharedMemory]:
+        """
+        Copies prices into a new shared memory block. The caller owns the block and must close and unlink it.
+        """
+        values = prices.to_numpy(dtype=np.float64)
+        block = SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=np.float64, buffer=block.buf)[:] = values
+        return cls(block.name, prices.index, list(prices.columns)), block
+
+    def read(self, tickers: List[str]) -> pd.DataFrame:
+        """
+        Returns the prices of the tickers (a copy of their columns only), NaN for tickers which are not in the block.
+        """
+        # Workers of the pool share the resource tracker of the parent, which owns and unlinks the block
+        block = SharedMemory(name=self.name)
+        try:
+            values = np.ndarray((len(self.index), len(self.tickers)), dtype=np.float64, buffer=block.buf)
+            positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+            columns = np.array([positions.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+            # Fancy indexing copies the selected columns, so nothing refers to the block once it is closed
+            selected = values[:, np.maximum(columns, 0)]
+            selected[:, columns < 0] = np.nan
+        finally:
+            block.close()
+        return pd.DataFrame(selected, index=self.index, columns=tickers)
+
+
+def _evaluate(prices: SharedPrices, tickers: List[str], scenarios: List[Tuple[int, str, dict]]) -> List[tuple]:
+    # Worker task: all scenarios of one (tickers, dates) pair, so the estimates are computed only once
+    data = prices.read(tickers).dropna(how='all').dropna(axis=1, how='all')
+    outcomes = []
+    try:
+        optimizer = PortfolioOptimization(data)
+    except Exception as e:
+        return [(number, None, None, f"{type(e).__name__}: {e}") for number, _, _ in scenarios]
+    for number, method, options in scenarios:
+        try:
+            weights = optimizer.optimize(method, **options)
+            outcomes.append((number, weights, optimizer.performance, None))
+        except Exception as e:
+            outcomes.append((number, None, None, f"{type(e).__name__}: {e}"))
+    return outcomes
+
+
+@dataclass
+class ScenarioResults:
+    """
+    Outcome of run_scenarios.
+
+    Attributes:
+        performance (pd.DataFrame): One row per scenario, indexed by its label, with columns Method, Start, End,
+                                    Assets, Expected return, Volatility, Sharpe ratio and Error (None if it succeeded).
+        weights (pd.DataFrame): Tidy weights with columns Scenario, Ticker and Weight.
+    """
+    performance: pd.DataFrame
+    weights: pd.DataFrame
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        failed = self.performance['Error'].dropna()
+        return dict(zip(failed.index, failed))
+
+    def weights_table(self) -> pd.DataFrame:
+        """
+        Returns the weights as a data frame with one row per scenario and one column per ticker, NaN for tickers
+        which are not in the scenario.
+        """
+        return self.weights.pivot(index='Scenario', columns='Ticker', values='Weight').reindex(
+            [label for label in self.performance.index if label in set(self.weights['Scenario'])])
+
+
+def run_scenarios(
+        scenarios: List[Union[Scenario, dict]],
+        n_jobs: int = 1,
+        cache: Optional[PriceCache] = None
+        ) -> ScenarioResults:
+    """
+    Evaluates many scenarios in a pool of processes, with price data shared through shared memory.
+
+    Scenarios with the same date range share one download and one shared memory block (the union of their
+    tickers). Scenarios which differ only in the method (and options) are solved in the same task, reusing
+    the estimates. A failing scenario (or a failed download of its date range) is reported in the results
+    instead of stopping the rest.
+
+    Parameters:
+    -----------
+    scenarios : list
+        Scenario objects, or dictionaries of their fields, e.g. {'tickers': 'WIG20', 'method': 'HRP', 'period': '5y'}.
+
+    n_jobs : int
+        Number of worker processes. With 1 everything runs in the current process.
+
+    cache : PriceCache, optional
+        Price cache to read through, the default cache if not provided.
+
+    Returns:
+    --------
+    ScenarioResults
+        Performance of every scenario and the weights of its portfolio.
+    """
+    scenarios = [s if isinstance(s, Scenario) else Scenario(**s) for s in scenarios]
+    unknown = {s.method for s in scenarios} - set(METHODS)
+    if unknown:
+        raise ValueError(f"Unknown methods: {sorted(unknown)}, expected one of {METHODS}")
+    cache = cache if cache is not None else get_default_cache()
+
+    # Labels must be unique, repeated ones get their position appended
+    labels = [s.label for s in scenarios]
+    labels = [f'{label} #{i}' if labels.count(label) > 1 else label for i, label in enumerate(labels)]
+    ticker_lists = [s.ticker_list for s in scenarios]
+    dates = [s.dates for s in scenarios]
+
+    # Tasks: scenarios grouped by date range, then by tickers
+    tasks: Dict[tuple, Dict[tuple, List[tuple]]] = {}
+    for number, (scenario, tickers, span) in enumerate(zip(scenarios, ticker_lists, dates)):
+        tasks.setdefault(span, {}).setdefault(tuple(tickers), []).append((number, scenario.method, scenario.options))
+
+    blocks: List[SharedMemory] = []
+    outcomes = []
+    try:
+        shared = {}
+        with instrumentation.stage('scenarios.download'):
+            for (start, end), groups in tasks.items():
+                union = list(dict.fromkeys(ticker for tickers in groups for ticker in tickers))
+                try:
+                    prices = Portfolio(union, start_date=start, end_date=end, cache=cache).historical_data.sort_index()
+                except Exception as e:
+                    # Every scenario of the range fails, the other ranges are still evaluated
+                    error = f"{type(e).__name__}: {e}"
+                    outcomes.extend((number, None, None, error) for group in groups.values() for number, _, _ in group)
+                    continue
+                shared[(start, end)], block = SharedPrices.create(prices)
+                blocks.append(block)
+
+        jobs = [(shared[span], list(tickers), group)
+                for span, groups in tasks.items() if span in shared for tickers, group in groups.items()]
+        with instrumentation.stage('scenarios.evaluate'):
+            if n_jobs == 1:
+                for job in jobs:
+                    outcomes.extend(_evaluate(*job))
+            elif jobs:
+                with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                    for result in executor.map(_evaluate, *zip(*jobs)):
+                        outcomes.extend(result)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    outcomes = {number: outcome for number, *outcome in outcomes}
+    rows, weight_rows = [], []
+    for number, (scenario, label, (start, end)) in enumerate(zip(scenarios, labels, dates)):
+        weights, performance, error = outcomes[number]
+        expected_return, volatility, sharpe = performance if performance is not None else (np.nan,) * 3
+        rows.append({
+            'Scenario': label, 'Method': scenario.method, 'Start': start, 'End': end,
+            'Assets': len(weights) if weights is not None else 0, 'Expected return': expected_return,
+            'Volatility': volatility, 'Sharpe ratio': sharpe, 'Error': error
+        })
+        if weights is not None:
+            weight_rows.extend({'Scenario': label, 'Ticker': ticker, 'Weight': weight} for ticker, weight in weights.items())
+
+    return ScenarioResults(
+        performance=pd.DataFrame(rows).set_index('Scenario'),
+        weights=pd.DataFrame(weight_rows, columns=['Scenario', 'Ticker', 'Weight'])
+    )
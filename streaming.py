@@ -0,0 +1,147 @@
+import time
+
+import pandas as pd
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+import instrumentation
+
+from data_cache import PriceCache, get_default_cache
+
+
+@dataclass
+class PriceChunk:
+    """
+    One chunk of a streamed download.
+
+    Attributes:
+        number (int): Position of the chunk in the stream, starting from 0.
+        tickers (List[str]): Tickers requested in the chunk.
+        data (Optional[pd.DataFrame]): OHLCV history in the column grouped layout (Price, Ticker) of the tickers
+                                       which returned bars, None if none of them did.
+        error (Optional[str]): Last error message if the chunk failed.
+        failures (Dict[str, str]): Tickers without any bars after every attempt, mapped to the error message.
+    """
+    number: int
+    tickers: List[str]
+    data: Optional[pd.DataFrame] = None
+    error: Optional[str] = None
+    failures: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> bool:
+        return self.data is None
+
+
+def _download_chunk(
+        cache: PriceCache,
+        number: int,
+        tickers: List[str],
+        dates: dict,
+        retries: int,
+        backoff: float
+        ) -> PriceChunk:
+    frames, pending, error = [], list(tickers), None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        try:
+            with instrumentation.stage('stream_chunk'):
+                # Retries skip the cache's memory of empty answers, the tickers failed only a moment ago
+                data = cache.get(pending, **dates, retry_empty=attempt > 0)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            continue
+        # yfinance does not raise for tickers it cannot download, it returns empty columns for them
+        has_bars = data.notna().any().groupby(level=1).any()
+        empty = [ticker for ticker in pending if not has_bars.get(ticker, False)]
+        if len(empty) < len(pending):
+            frames.append(data.drop(columns=empty, level=1))
+        pending = empty
+        if not pending:
+            break
+        error = 'No data returned'
+
+    failures = dict.fromkeys(pending, error)
+    if failures:
+        instrumentation.count('stream_chunk.failures', len(failures))
+    if not frames:
+        return PriceChunk(number, tickers, error=error, failures=failures)
+    data = frames[0]
+    if len(frames) > 1:
+        # Tickers recovered by a retry are put back in the order of the chunk
+        fields = data.columns.get_level_values(0).unique()
+        kept = [ticker for ticker in tickers if ticker not in failures]
+        data = pd.concat(frames, axis=1).reindex(columns=pd.MultiIndex.from_product(
+            [fields, kept], names=data.columns.names)).sort_index()
+    return PriceChunk(number, tickers, data=data, failures=failures)
+
+
+def stream_prices(
+        tickers: List[str],
+        start_date=None,
+        end_date=None,
+        period: str = '1y',
+        chunk_size: int = 100,
+        max_workers: int = 4,
+        retries: int = 2,
+        backoff: float = 1.0,
+        cache: Optional[PriceCache] = None
+        ) -> Iterator[PriceChunk]:
+    """
+    Downloads a large list of tickers in chunks and yields them one by one, so that the whole universe is never
+    held in memory at once and a failing chunk does not stop the rest.
+
+    Chunks are read through the price cache by a bounded pool of threads. Only a few of them are in flight at once
+    and finished ones are yielded in order, so memory depends on chunk_size and max_workers, not on the number of
+    tickers. Failed attempts, and tickers which returned no bars, are retried with exponential backoff (backoff,
+    2 * backoff, ...). Tickers which still have no bars are listed in the failures of their chunk, a chunk which
+    still fails as a whole is yielded with its error instead of data.
+
+    Parameters:
+    -----------
+    tickers : list
+        Tickers to download.
+
+    start_date, end_date : str or datetime, optional
+        Explicit date range, used if both are given.
+
+    period : str
+        yfinance period used when the dates are not given.
+
+    chunk_size : int
+        Number of tickers in a chunk (one request to the data source).
+
+    max_workers : int
+        Maximal number of chunks downloaded at the same time.
+
+    retries : int
+        Number of additional attempts after a failed one.
+
+    backoff : float
+        Delay (in seconds) before the first retry, doubled for every next one.
+
+    cache : PriceCache, optional
+        Price cache to read through, the default cache if not provided.
+
+    Yields:
+    -------
+    PriceChunk
+        Chunks in the order of the tickers.
+    """
+    cache = cache if cache is not None else get_default_cache()
+    dates = {'start_date': start_date, 'end_date': end_date} if start_date and end_date else {'period': period}
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[start:start + chunk_size] for start in range(0, len(tickers), chunk_size)]
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chunks') as executor:
+        pending = deque()
+        for number, chunk in enumerate(chunks):
+            pending.append(executor.submit(_download_chunk, cache, number, chunk, dates, retries, backoff))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pypfopt.discrete_allocation import DiscreteAllocation
+
+from allocation import allocate, latest_prices
+from benchmarks.synthetic import SyntheticSource
+
+
+BUDGETS = [1_000, 10_000, 123_456.78]
+
+
+@pytest.fixture(scope='module')
+def prices():
+    close = SyntheticSource(12, 1, seed=6, end='2024-12-31').panel['Close']
+    # Prices from a few to a few hundred, so that some assets do not fit into the smallest budget
+    return latest_prices(close) * np.geomspace(0.05, 5, close.shape[1])
+
+
+@pytest.fixture(scope='module')
+def weights(prices):
+    rng = np.random.default_rng(7)
+    sets = rng.dirichlet(np.full(len(prices), 0.7), size=4)
+    sets[1, [0, 3, 4]] = 0.0
+    sets[2] = 1 / len(prices)
+    sets /= sets.sum(axis=1, keepdims=True)
+    return pd.DataFrame(sets, index=['a', 'b', 'equal', 'd'], columns=prices.index)
+
+
+def test_greedy_matches_discrete_allocation(weights, prices):
+    result = allocate(weights, prices, BUDGETS, method='greedy')
+    for name, row in weights.iterrows():
+        for j, budget in enumerate(BUDGETS):
+            target = {ticker: weight for ticker, weight in row.items() if weight > 0}
+            expected, leftover = DiscreteAllocation(target, prices, total_portfolio_value=budget).greedy_portfolio()
+            assert result.allocation(name, budget) == {ticker: int(n) for ticker, n in expected.items() if n}
+            assert result.leftover[weights.index.get_loc(name), j] == pytest.approx(leftover, abs=1e-6)
+
+
+def test_single_weight_set_and_budget(weights, prices):
+    result = allocate(weights.loc['a'], prices, 5_000)
+    assert result.shares.shape == (1, 1, len(prices))
+    assert (result.shares @ prices.to_numpy() + result.leftover <= 5_000 + 1e-9).all()
+
+
+@pytest.mark.parametrize('method', ['greedy', 'rounding'])
+def test_allocation_stays_within_budget(weights, prices, method):
+    result = allocate(weights, prices, BUDGETS, method=method)
+    spent = result.shares @ prices.to_numpy()
+    np.testing.assert_allclose(spent + result.leftover, np.broadcast_to(BUDGETS, spent.shape))
+    assert (result.leftover >= 0).all() and (result.shares >= 0).all()
+
+
+def test_negative_weights_are_rejected(weights, prices):
+    short = weights.copy()
+    short.iloc[0, 0] = -0.1
+    with pytest.raises(ValueError):
+        allocate(short, prices, BUDGETS)
+
+
+def test_missing_prices_are_rejected(weights, prices):
+    with pytest.raises(ValueError, match=prices.index[0]):
+        allocate(weights, prices.drop(prices.index[0]), BUDGETS)
+    with_nan = prices.copy()
+    with_nan.iloc[1] = np.nan
+    with pytest.raises(ValueError, match=prices.index[1]):
+        allocate(weights, with_nan, BUDGETS)
+
+
+@pytest.mark.parametrize('budgets', [0, -1_000, [1_000, 0]])
+def test_budgets_must_be_positive(weights, prices, budgets):
+    with pytest.raises(ValueError):
+        allocate(weights, prices, budgets)
+
+
+def test_unknown_method_is_rejected(weights, prices):
+    with pytest.raises(ValueError):
+        allocate(weights, prices, BUDGETS, method='lp')
@@ -0,0 +1,117 @@
+import time
+import threading
+
+from asset_info import AssetInfoCache, fetch_asset_info
+from benchmarks.synthetic import canned_info
+
+
+FIELDS = ['sectorKey', 'country', 'marketCap']
+
+
+class StubFetcher:
+    """
+    Offline replacement of yahoo_info returning canned info dictionaries. Tickers in failures raise on their
+    first attempts, tickers in hanging block until released.
+    """
+    def __init__(self, failures=None, hanging=()):
+        self.failures = dict(failures or {})
+        self.hanging = set(hanging)
+        self.release = threading.Event()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker):
+        with self._lock:
+            self.calls.append(ticker)
+            remaining = self.failures.get(ticker, 0)
+            if remaining:
+                self.failures[ticker] = remaining - 1
+        if ticker in self.hanging:
+            self.release.wait(5)
+        if remaining:
+            raise ConnectionError(f"{ticker} unavailable")
+        return canned_info(ticker)
+
+
+def test_fetches_requested_fields_in_order():
+    fetcher = StubFetcher()
+    tickers = ['CCC', 'AAA', 'BBB', 'AAA']
+    result = fetch_asset_info(tickers, FIELDS, fetcher=fetcher, cache=AssetInfoCache())
+
+    assert result.info['Ticker'].to_list() == ['CCC', 'AAA', 'BBB']
+    assert result.info.columns.to_list() == ['Ticker'] + FIELDS
+    assert result.info.set_index('Ticker').loc['AAA', 'sectorKey'] == canned_info('AAA')['sectorKey']
+    assert sorted(fetcher.calls) == ['AAA', 'BBB', 'CCC']
+    assert result.failures == {} and result.cached == []
+
+
+def test_missing_fields_are_none():
+    result = fetch_asset_info(['AAA'], ['sectorKey', 'noSuchField'], fetcher=StubFetcher(), cache=None)
+    assert result.info.loc[0, 'noSuchField'] is None
+
+
+def test_hits_are_served_from_cache():
+    cache = AssetInfoCache()
+    fetch_asset_info(['AAA', 'BBB'], FIELDS, fetcher=StubFetcher(), cache=cache)
+
+    fetcher = StubFetcher()
+    result = fetch_asset_info(['AAA', 'BBB', 'CCC'], FIELDS, fetcher=fetcher, cache=cache)
+    assert fetcher.calls == ['CCC']
+    assert result.cached == ['AAA', 'BBB']
+    assert result.info['Ticker'].to_list() == ['AAA', 'BBB', 'CCC']
+
+    # Fields which were not fetched before make the entry incomplete
+    fetcher = StubFetcher()
+    fetch_asset_info(['AAA'], FIELDS + ['city'], fetcher=fetcher, cache=cache)
+    assert fetcher.calls == ['AAA']
+
+
+def test_stale_entries_are_fetched_again():
+    cache = AssetInfoCache(ttl=0.05)
+    fetch_asset_info(['AAA'], FIELDS, fetcher=StubFetcher(), cache=cache)
+    assert cache.get('AAA', FIELDS) is not None
+
+    time.sleep(0.1)
+    assert cache.get('AAA', FIELDS) is None
+    fetcher = StubFetcher()
+    result = fetch_asset_info(['AAA'], FIELDS, fetcher=fetcher, cache=cache)
+    assert fetcher.calls == ['AAA']
+    assert result.cached == []
+
+
+def test_failed_attempt_is_retried():
+    fetcher = StubFetcher(failures={'AAA': 2})
+    result = fetch_asset_info(['AAA', 'BBB'], FIELDS, fetcher=fetcher, cache=None, retries=2, backoff=0.01)
+    assert fetcher.calls.count('AAA') == 3
+    assert result.failures == {}
+    assert result.info['Ticker'].to_list() == ['AAA', 'BBB']
+
+
+def test_failures_are_reported_with_the_other_rows():
+    cache = AssetInfoCache()
+    fetcher = StubFetcher(failures={'BBB': 10})
+    result = fetch_asset_info(['AAA', 'BBB', 'CCC'], FIELDS, fetcher=fetcher, cache=cache, retries=1, backoff=0.01)
+
+    assert fetcher.calls.count('BBB') == 2
+    assert list(result.failures) == ['BBB']
+    assert 'ConnectionError' in result.failures['BBB']
+    assert result.info['Ticker'].to_list() == ['AAA', 'CCC']
+    # Failures are not cached, the next call asks for them again
+    assert cache.get('BBB', FIELDS) is None
+
+
+def test_hanging_fetcher_times_out():
+    fetcher = StubFetcher(hanging={'BBB'})
+    start = time.perf_counter()
+    try:
+        result = fetch_asset_info(['AAA', 'BBB'], FIELDS, fetcher=fetcher, cache=None, timeout=0.2, retries=1,
+                                  backoff=0.01)
+    finally:
+        fetcher.release.set()
+    elapsed = time.perf_counter() - start
+
+    assert fetcher.calls.count('BBB') == 2
+    assert result.failures == {'BBB': 'Timed out after 0.2 s'}
+    assert result.info['Ticker'].to_list() == ['AAA']
+    # Two attempts of 0.2 s, not the 5 s the fetcher would hang for
+    assert elapsed < 2
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtesting import RollingMoments, walk_forward_backtest
+from benchmarks.synthetic import SyntheticSource
+
+
+@pytest.fixture(scope='module')
+def prices():
+    return SyntheticSource(5, 2, seed=8, end='2024-12-31').panel['Close']
+
+
+def test_rolling_moments_match_numpy():
+    rows = np.random.default_rng(9).normal(0.001, 0.02, (300, 4))
+    moments = RollingMoments(4)
+    start, end = 0, 0
+    # Growing, sliding by different steps, shrinking and growing again
+    for new_start, new_end in [(0, 50), (0, 120), (10, 130), (45, 131), (45, 200), (150, 200), (150, 300)]:
+        moments.add(rows[end:new_end])
+        moments.remove(rows[start:new_start])
+        start, end = new_start, new_end
+
+        window = rows[start:end]
+        assert moments.n == len(window)
+        np.testing.assert_allclose(moments.mean(), window.mean(axis=0), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(moments.covariance(), np.cov(window, rowvar=False), rtol=1e-7, atol=1e-12)
+
+
+@pytest.mark.parametrize('method', ['min_volatility', 'HRP'])
+def test_parallel_solves_match_sequential(prices, method):
+    options = {'method': method, 'window': 126, 'rebalance': 'M'}
+    sequential = walk_forward_backtest(prices, **options, n_jobs=1)
+    parallel = walk_forward_backtest(prices, **options, n_jobs=2)
+
+    assert len(sequential.weights) > 10
+    pd.testing.assert_frame_equal(parallel.weights, sequential.weights)
+    pd.testing.assert_series_equal(parallel.returns, sequential.returns)
+    pd.testing.assert_series_equal(parallel.turnover, sequential.turnover)
+    assert parallel.failures == sequential.failures
+
+
+def test_weights_are_held_between_rebalances(prices):
+    result = walk_forward_backtest(prices, method='min_volatility', window=126, rebalance=21, expanding=True)
+    # pypfopt rounds the weights to 5 decimals
+    np.testing.assert_allclose(result.weights.sum(axis=1), 1.0, atol=1e-4)
+
+    # Returns of the first holding period are those of the first weights drifting with the prices
+    returns = prices.sort_index().pct_change().iloc[1:]
+    first, second = result.weights.index[:2]
+    period = returns.loc[first:second].iloc[:-1]
+    value = (1 + period).cumprod() @ result.weights.iloc[0]
+    expected = value / np.r_[1.0, value.iloc[:-1]] - 1
+    np.testing.assert_allclose(result.returns.loc[first:second].iloc[:-1], expected, rtol=1e-10)
+
+
+def test_short_data_is_rejected(prices):
+    with pytest.raises(ValueError):
+        walk_forward_backtest(prices.iloc[:100], window=126)
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_cache import PriceCache
+from benchmarks.synthetic import SyntheticSource
+
+
+class RecordingSource(SyntheticSource):
+    """
+    Synthetic source remembering every requested range. Tickers in failing return NaN columns, like yfinance
+    does for a ticker it could not download.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = []
+        self.failing = set()
+
+    def download(self, tickers, start, end, interval):
+        self.requests.append((list(tickers), start, end))
+        data = super().download(tickers, start, end, interval)
+        for ticker in self.failing & set(tickers):
+            data.loc[:, (slice(None), ticker)] = np.nan
+        return data
+
+
+@pytest.fixture
+def source():
+    return RecordingSource(5, 2, seed=1, end='2024-06-28')
+
+
+def test_get_matches_source(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    data = cache.get(source.tickers, start_date='2024-01-01', end_date='2024-06-01')
+    expected = source.panel.loc['2024-01-01':'2024-05-31', data.columns]
+    expected.index = expected.index.as_unit('ns')
+    pd.testing.assert_frame_equal(data, expected, check_freq=False)
+
+
+def test_top_up_requests_only_missing_range(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    cache.get(source.tickers, start_date='2024-01-01', end_date='2024-03-01')
+    cache.get(source.tickers, start_date='2024-01-01', end_date='2024-06-01')
+
+    assert len(source.requests) == 2
+    tickers, start, end = source.requests[1]
+    assert tickers == source.tickers
+    assert (start, end) == (pd.Timestamp('2024-03-01'), pd.Timestamp('2024-06-01'))
+
+    # Everything is cached now, a smaller range needs no download
+    cache.get(source.tickers[:2], start_date='2024-02-01', end_date='2024-05-01')
+    assert len(source.requests) == 2
+
+
+def test_gap_without_weekdays_is_not_requested(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    # 2024-06-22 is a Saturday, the range up to Monday 2024-06-24 (exclusive) adds only the weekend
+    cache.get(source.tickers, start_date='2024-06-01', end_date='2024-06-22')
+    cache.get(source.tickers, start_date='2024-06-01', end_date='2024-06-24')
+    assert len(source.requests) == 1
+
+
+def test_repeated_period_request_is_served_from_cache(tmp_path):
+    # History up to yesterday, so that the period has bars whatever the day of the run
+    source = RecordingSource(5, 1, seed=1)
+    cache = PriceCache(str(tmp_path), source=source)
+    first = cache.get(source.tickers, period='1mo')
+    second = cache.get(source.tickers, period='1mo')
+    assert len(source.requests) == 1
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
+
+
+def test_failed_ticker_is_requested_again_after_retry_after(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    failing = source.tickers[2]
+    source.failing = {failing}
+    data = cache.get(source.tickers, start_date='2024-01-01', end_date='2024-06-01')
+    assert data['Close'][failing].isna().all()
+    assert data['Close'][source.tickers[0]].notna().all()
+
+    # The empty answer is remembered for retry_after, the source is not asked again at once
+    source.failing = set()
+    cache.get(source.tickers, start_date='2024-01-01', end_date='2024-06-01')
+    assert len(source.requests) == 1
+
+    cache.retry_after = 0
+    data = cache.get(source.tickers, start_date='2024-01-01', end_date='2024-06-01')
+    assert source.requests[-1][0] == [failing]
+    assert data['Close'][failing].notna().all()
+    expected = source.panel.loc['2024-01-01':'2024-05-31', ('Close', failing)]
+    np.testing.assert_allclose(data['Close'][failing].to_numpy(), expected.to_numpy())
+
+
+def test_failed_top_up_keeps_coverage(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source, retry_after=0)
+    ticker = source.tickers[0]
+    cache.get([ticker], start_date='2024-01-01', end_date='2024-03-01')
+
+    source.failing = {ticker}
+    cache.get([ticker], start_date='2024-01-01', end_date='2024-06-01')
+    source.failing = set()
+    data = cache.get([ticker], start_date='2024-01-01', end_date='2024-06-01')
+
+    assert source.requests[-1][1:] == (pd.Timestamp('2024-03-01'), pd.Timestamp('2024-06-01'))
+    assert len(data) == len(source.panel.loc['2024-01-01':'2024-05-31'])
+
+
+def test_range_before_listing_is_requested_once(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    first_bar = source.panel.index[0]
+    cache.get(source.tickers, start_date=first_bar, end_date='2024-06-01')
+
+    for _ in range(3):
+        data = cache.get(source.tickers, start_date='2020-01-01', end_date='2024-06-01')
+    # One request for the range before the first bar, which is covered from then on
+    assert len(source.requests) == 2
+    assert data.index[0] == first_bar
+
+
+def test_range_after_delisting_is_not_requested_on_every_call(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    cache.get(source.tickers, start_date='2024-01-01', end_date='2024-07-01')
+    for _ in range(3):
+        data = cache.get(source.tickers, start_date='2024-01-01', end_date='2024-09-02')
+    assert len(source.requests) == 2
+    assert data.index[-1] == source.panel.index[-1]
+
+    # The empty range is tried again after retry_after
+    cache.retry_after = 0
+    cache.get(source.tickers, start_date='2024-01-01', end_date='2024-09-02')
+    assert len(source.requests) == 3
+
+
+def test_eviction_keeps_cache_under_limit(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    cache.get(source.tickers[:1], start_date='2023-01-01', end_date='2024-06-01')
+    entry_size = cache.size()
+
+    # Room for about two entries: older ones are removed, the ones of the current request are always kept
+    cache.max_bytes = int(2.5 * entry_size)
+    for ticker in source.tickers[1:]:
+        cache.get([ticker], start_date='2023-01-01', end_date='2024-06-01')
+        assert cache.size() <= cache.max_bytes
+
+    cached = {path.name for path in (tmp_path / '1d').iterdir()}
+    assert cached == set(source.tickers[-2:])
+
+    # An evicted ticker is downloaded again
+    n_requests = len(source.requests)
+    cache.get(source.tickers[:1], start_date='2023-01-01', end_date='2024-06-01')
+    assert len(source.requests) == n_requests + 1
+
+
+def test_clear(tmp_path, source):
+    cache = PriceCache(str(tmp_path), source=source)
+    cache.get(source.tickers, start_date='2024-01-01', end_date='2024-03-01')
+    assert cache.size() > 0
+    cache.clear()
+    assert cache.size() == 0
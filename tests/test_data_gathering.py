@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from asset_info import fetch_asset_info
+from data_cache import PriceCache
+from data_gathering import Portfolio, RELEVANT_INFO, TrailingAverages, calculate_averages
+from benchmarks.synthetic import SyntheticSource, canned_info
+
+
+END_DATE = '2024-06-28'
+
+
+@pytest.fixture
+def source():
+    source = SyntheticSource(6, 2, seed=2, end=END_DATE)
+    # A ticker without prices for a month and a single missing day of another one
+    source.panel.loc[source.panel.index[100:130], (slice(None), 'SYN0003')] = np.nan
+    source.panel.loc[source.panel.index[-20], (slice(None), 'SYN0001')] = np.nan
+    # Filling the asset info cache, so that the portfolios never ask Yahoo
+    fetch_asset_info(source.tickers, RELEVANT_INFO, fetcher=canned_info)
+    return source
+
+
+@pytest.fixture
+def cache(tmp_path, source):
+    return PriceCache(str(tmp_path), source=source)
+
+
+def portfolio(source, cache, end=None):
+    dates = source.panel.index
+    end = dates[-1] + pd.Timedelta(days=1) if end is None else end
+    return Portfolio(source.tickers, start_date=dates[0], end_date=end, cache=cache)
+
+
+def test_daily_info_drops_days_without_prices(source, cache):
+    daily_info = portfolio(source, cache).daily_info
+    gap = source.panel.index[100:130]
+    assert not ((daily_info['Ticker'] == 'SYN0003') & daily_info.index.isin(gap)).any()
+    assert len(daily_info) == source.panel['Close'].notna().sum().sum()
+
+
+def test_compact_daily_info_has_daily_info_rows(source, cache):
+    pft = portfolio(source, cache)
+    daily_info = pft.daily_info
+    compact = pft.get_compact_daily_info().to_frame()
+
+    assert len(compact) == len(daily_info)
+    assert (compact.index == daily_info.index).all()
+    assert (compact['Ticker'].astype(str).to_numpy() == daily_info['Ticker'].to_numpy()).all()
+    for column in ['Close', 'Open', 'Volume']:
+        np.testing.assert_allclose(compact[column].to_numpy(dtype=np.float64), daily_info[column].to_numpy(), rtol=1e-6)
+
+
+def assert_same(left, right):
+    # Index frequencies differ between frames built at once and frames grown by concatenation
+    pd.testing.assert_frame_equal(left, right, check_freq=False, check_exact=False, rtol=1e-10, atol=1e-8)
+
+
+def test_update_matches_full_rebuild(source, cache):
+    dates = source.panel.index
+    full = portfolio(source, cache)
+    incremental = portfolio(source, cache, end=dates[-40])
+    incremental.daily_info
+    incremental.daily_returns
+
+    bars = full.column_grouped_data
+    # Batches of several days, a single day and the rest, one of them with the missing day of SYN0001
+    for start, end in [(-40, -25), (-25, -24), (-24, None)]:
+        appended = incremental.update(bars.iloc[start:end])
+        assert len(appended) == len(bars.iloc[start:end])
+
+    assert_same(incremental.column_grouped_data, full.column_grouped_data)
+    assert_same(incremental.historical_data, full.historical_data)
+    assert_same(incremental.daily_returns, full.daily_returns)
+    assert_same(incremental.daily_info, full.daily_info)
+
+
+def test_update_without_new_bars(source, cache):
+    pft = portfolio(source, cache)
+    assert pft.update(pft.column_grouped_data.iloc[:0]).empty
+    with pytest.raises(ValueError):
+        pft.update(pft.column_grouped_data.iloc[-2:])
+
+
+def test_trailing_averages_match_calculate_averages(source, cache):
+    close = portfolio(source, cache).historical_data
+    chronological = close.sort_index()
+    periods = [1, 5, 20, 400]
+
+    averages = TrailingAverages(chronological.iloc[:150], 'Close', periods)
+    for start, end in [(150, 151), (151, 200), (200, None)]:
+        averages.append(chronological.iloc[start:end])
+
+    expected = calculate_averages(close, 'Close', periods)
+    pd.testing.assert_frame_equal(averages.frame(), expected, check_exact=False, rtol=1e-10, atol=1e-8)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from pypfopt import EfficientFrontier, expected_returns, risk_models
+
+from optimization import efficient_frontier
+from benchmarks.synthetic import SyntheticSource
+
+
+BOUNDS = (0.0, 0.4)
+
+
+@pytest.fixture(scope='module')
+def estimates():
+    close = SyntheticSource(8, 3, seed=10, end='2024-12-31').panel['Close']
+    return expected_returns.mean_historical_return(close), risk_models.sample_cov(close)
+
+
+@pytest.fixture(scope='module', params=['return', 'risk'])
+def frontier(request, estimates):
+    return request.param, efficient_frontier(*estimates, n_points=25, target=request.param, weight_bounds=BOUNDS)
+
+
+def test_points_are_sorted_by_target(frontier):
+    target, result = frontier
+    points = result.to_frame()
+    assert not points.isna().any().any()
+    assert (np.diff(points['Target']) > 0).all()
+    # Along the efficient frontier both return and volatility grow with the target
+    assert (np.diff(points['Return']) > -1e-9).all()
+    assert (np.diff(points['Volatility']) > -1e-9).all()
+    # Targets are met, closely except near the minimal volatility end, where the variance is flat in the return
+    # (and the target of the first point is inactive), so the solver tolerance shows
+    if target == 'return':
+        assert (points['Return'] >= points['Target'] - 1e-8).all()
+        np.testing.assert_allclose(points['Return'][5:], points['Target'][5:], rtol=1e-6)
+    else:
+        np.testing.assert_allclose(points['Volatility'], points['Target'], rtol=1e-6)
+
+
+def test_weights_sum_to_one_within_bounds(frontier):
+    _, result = frontier
+    np.testing.assert_allclose(result.weights.sum(axis=1), 1.0, atol=1e-8)
+    assert (result.weights >= BOUNDS[0] - 1e-8).all() and (result.weights <= BOUNDS[1] + 1e-8).all()
+
+
+@pytest.mark.parametrize('i', [0, 6, 12, 24])
+def test_points_match_pypfopt(frontier, estimates, i):
+    target, result = frontier
+    mu, S = estimates
+    ef = EfficientFrontier(mu, S, weight_bounds=BOUNDS)
+    if target == 'return':
+        ef.efficient_return(result.points[i, 0])
+    else:
+        ef.efficient_risk(result.points[i, 0])
+    weights = np.array([ef.weights[j] for j in range(len(mu))])
+
+    volatility = np.sqrt(weights @ S.to_numpy() @ weights)
+    assert result.points[i, 2] == pytest.approx(volatility, abs=1e-7)
+    if i:
+        # At the minimal volatility end the return target is inactive and the return is flat in the weights
+        assert result.points[i, 1] == pytest.approx(weights @ mu.to_numpy(), abs=1e-7)
+        np.testing.assert_allclose(result.weights[i], weights, atol=1e-6)
+
+
+def test_unknown_target_is_rejected(estimates):
+    with pytest.raises(ValueError):
+        efficient_frontier(*estimates, target='sharpe')
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pypfopt import HRPOpt
+
+import hrp
+import instrumentation
+
+from benchmarks.synthetic import SyntheticSource
+
+
+@pytest.fixture(scope='module')
+def returns():
+    # An odd number of assets, so the bisection splits clusters of uneven sizes
+    return SyntheticSource(13, 2, seed=5, end='2024-12-31').panel['Close'].pct_change().dropna()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    hrp._LINKAGE_CACHE.clear()
+    yield
+    hrp._LINKAGE_CACHE.clear()
+
+
+@pytest.mark.parametrize('linkage_method', ['single', 'ward'])
+def test_matches_pypfopt(returns, linkage_method):
+    weights, _ = hrp.hrp_portfolio(returns, linkage_method=linkage_method)
+    expected = pd.Series(HRPOpt(returns).optimize(linkage_method=linkage_method))
+
+    assert list(weights.index) == list(returns.columns)
+    np.testing.assert_allclose(weights.to_numpy(), expected[weights.index].to_numpy(), rtol=1e-9, atol=1e-12)
+    assert weights.sum() == pytest.approx(1.0)
+
+
+def test_cache_hit_returns_the_same_order(returns):
+    with instrumentation.profiling() as profiler:
+        linkage, order = hrp.cluster_assets(returns, 'ward')
+        weights, _ = hrp.hrp_portfolio(returns.copy(), linkage_method='ward')
+        cached_linkage, cached_order = hrp.cluster_assets(returns.copy(), 'ward')
+
+    assert profiler.report().caches['hrp_linkage'] == {'hits': 2, 'misses': 1}
+    np.testing.assert_array_equal(cached_order, order)
+    np.testing.assert_array_equal(cached_linkage, linkage)
+
+    # A fresh clustering gives the same order and weights
+    hrp._LINKAGE_CACHE.clear()
+    _, fresh_order = hrp.cluster_assets(returns, 'ward')
+    np.testing.assert_array_equal(fresh_order, order)
+    pd.testing.assert_series_equal(hrp.hrp_portfolio(returns, linkage_method='ward')[0], weights)
+
+
+def test_linkage_methods_are_cached_separately(returns):
+    _, single = hrp.cluster_assets(returns, 'single')
+    _, ward = hrp.cluster_assets(returns, 'ward')
+    assert len(hrp._LINKAGE_CACHE) == 2
+    np.testing.assert_array_equal(hrp.cluster_assets(returns, 'single')[1], single)
+    np.testing.assert_array_equal(hrp.cluster_assets(returns, 'ward')[1], ward)
@@ -0,0 +1,90 @@
+import threading
+
+import instrumentation
+
+
+@instrumentation.timed('work')
+def work():
+    instrumentation.count('items', 2)
+    instrumentation.cache_access('cache', hits=1, misses=1)
+
+
+def test_nothing_is_recorded_outside_a_session():
+    assert not instrumentation.enabled()
+    with instrumentation.stage('work'):
+        work()
+    with instrumentation.profiling() as profiler:
+        pass
+    assert profiler.report().stages == {}
+
+
+def test_session_records_stages_counters_and_caches():
+    reports = []
+    with instrumentation.profiling(hook=reports.append) as profiler:
+        assert instrumentation.enabled()
+        work()
+        with instrumentation.stage('outer'):
+            work()
+
+    report = profiler.report()
+    assert report.stages['work']['calls'] == 2 and report.stages['outer']['calls'] == 1
+    assert report.counters == {'items': 4}
+    assert report.hit_rate('cache') == 0.5
+    assert len(reports) == 1 and reports[0].counters == {'items': 4}
+    assert not instrumentation.enabled()
+
+
+def test_nested_sessions():
+    with instrumentation.profiling() as outer:
+        work()
+        with instrumentation.profiling() as inner:
+            work()
+        work()
+    assert outer.report().counters == {'items': 6}
+    assert inner.report().counters == {'items': 2}
+    assert not instrumentation.enabled()
+
+
+def test_overlapping_sessions():
+    # Session A starts first and ends first while B is still running, as with two threads profiling at once
+    a = instrumentation.profiling()
+    b = instrumentation.profiling()
+    profiler_a = a.__enter__()
+    work()
+    profiler_b = b.__enter__()
+    work()
+    a.__exit__(None, None, None)
+    assert instrumentation.enabled()
+    work()
+    b.__exit__(None, None, None)
+
+    assert not instrumentation.enabled()
+    assert profiler_a.report().counters == {'items': 4}
+    assert profiler_b.report().counters == {'items': 4}
+    assert profiler_a.report().stages['work']['calls'] == 2
+    assert profiler_b.report().stages['work']['calls'] == 2
+
+
+def test_overlapping_sessions_in_threads():
+    started, a_done = threading.Event(), threading.Event()
+    profilers = {}
+
+    def session_a():
+        with instrumentation.profiling() as profiler:
+            profilers['a'] = profiler
+            started.set()
+            work()
+        a_done.set()
+
+    with instrumentation.profiling() as profiler_b:
+        thread = threading.Thread(target=session_a)
+        thread.start()
+        started.wait(5)
+        a_done.wait(5)
+        thread.join()
+        assert instrumentation.enabled()
+        work()
+
+    assert not instrumentation.enabled()
+    assert profilers['a'].report().counters == {'items': 2}
+    assert profiler_b.report().counters == {'items': 4}
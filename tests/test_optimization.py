@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from optimization import PortfolioOptimization, solve_weights
+from benchmarks.synthetic import SyntheticSource
+
+
+@pytest.fixture(scope='module')
+def optimizer():
+    return PortfolioOptimization(SyntheticSource(6, 2, seed=3, end='2024-12-31').panel['Close'])
+
+
+def test_monte_carlo_is_reproducible(optimizer):
+    first = optimizer.monte_carlo(n_portfolios=2_500, chunk_size=1_000, seed=1)
+    second = optimizer.monte_carlo(n_portfolios=2_500, chunk_size=1_000, seed=1, keep_points=False)
+
+    assert len(first.points) == 2_500
+    assert second.points is None
+    assert second.max_sharpe == first.max_sharpe and second.min_volatility == first.min_volatility
+    assert first.max_sharpe == pytest.approx(first.points['Sharpe'].max(), rel=1e-6)
+    assert np.isclose(sum(first.max_sharpe_weights.values()), 1.0)
+
+
+@pytest.mark.parametrize('arguments', [{'n_portfolios': 0}, {'n_portfolios': -5}, {'chunk_size': 0}])
+@pytest.mark.parametrize('keep_points', [True, False])
+def test_monte_carlo_rejects_empty_simulations(optimizer, arguments, keep_points):
+    with pytest.raises(ValueError):
+        optimizer.monte_carlo(**{'n_portfolios': 100, **arguments}, keep_points=keep_points)
+
+
+@pytest.mark.parametrize('method', ['MV', 'min_volatility'])
+def test_weight_bounds_are_passed_to_the_frontier(method):
+    # The first asset is much less volatile, unbounded portfolios put most of the weight into it
+    tickers = ['A', 'B', 'C', 'D']
+    mu = pd.Series([0.08, 0.1, 0.12, 0.14], index=tickers)
+    S = pd.DataFrame(np.diag([0.001, 0.04, 0.05, 0.06]), index=tickers, columns=tickers)
+
+    unbounded, _ = solve_weights(mu, S, method)
+    bounded, _ = solve_weights(mu, S, method, weight_bounds=(0.1, 0.3))
+    assert unbounded['A'] > 0.5
+    assert all(0.1 - 1e-5 <= weight <= 0.3 + 1e-5 for weight in bounded.values())
+    assert sum(bounded.values()) == pytest.approx(1.0, abs=1e-4)
+
+
+@pytest.mark.parametrize('method', ['MV', 'min_volatility', 'HRP'])
+def test_unexpected_options_are_rejected(optimizer, method):
+    with pytest.raises(TypeError):
+        optimizer.optimize(method, target_return=0.1)
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from data_cache import PriceCache
+from data_gathering import Portfolio
+from optimization import PortfolioOptimization
+from scenarios import Scenario, run_scenarios
+from benchmarks.synthetic import SyntheticSource
+
+
+class FailingSource(SyntheticSource):
+    """
+    Synthetic source which cannot download anything starting before failing_before.
+    """
+    failing_before = pd.Timestamp('2023-01-01')
+
+    def download(self, tickers, start, end, interval):
+        if start < self.failing_before:
+            raise ConnectionError("Source unavailable")
+        return super().download(tickers, start, end, interval)
+
+
+@pytest.fixture
+def source():
+    return FailingSource(12, 3, seed=4, end='2024-12-31')
+
+
+@pytest.fixture
+def cache(tmp_path, source):
+    return PriceCache(str(tmp_path), source=source)
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_scenarios_match_single_optimization(source, cache, n_jobs):
+    tickers = source.tickers[:8]
+    dates = {'start_date': '2023-06-01', 'end_date': '2024-12-31'}
+    results = run_scenarios([Scenario(tickers, 'HRP', **dates), Scenario(tickers, 'min_volatility', **dates),
+                             Scenario(source.tickers[4:], 'HRP', **dates, name='other')], n_jobs=n_jobs, cache=cache)
+
+    assert results.errors == {}
+    assert results.performance.index.to_list() == ['8 tickers 2023-06-01..2024-12-31 HRP',
+                                                   '8 tickers 2023-06-01..2024-12-31 min_volatility', 'other']
+    expected = PortfolioOptimization(Portfolio(tickers, cache=cache, **dates)).optimize('HRP')
+    weights = results.weights_table().loc['8 tickers 2023-06-01..2024-12-31 HRP', tickers]
+    pd.testing.assert_series_equal(weights, pd.Series(expected, name=weights.name), check_names=False,
+                                   check_index=False)
+
+
+def test_failed_download_fails_only_its_range(source, cache):
+    tickers = source.tickers[:5]
+    results = run_scenarios([
+        Scenario(tickers, 'HRP', start_date='2022-01-03', end_date='2024-12-31', name='failing'),
+        Scenario(tickers, 'min_volatility', start_date='2022-01-03', end_date='2024-12-31', name='failing too'),
+        Scenario(tickers, 'HRP', start_date='2023-06-01', end_date='2024-12-31', name='working')
+    ], n_jobs=1, cache=cache)
+
+    assert set(results.errors) == {'failing', 'failing too'}
+    assert 'ConnectionError' in results.errors['failing']
+    assert results.performance.loc['working', 'Assets'] == 5
+    assert set(results.weights['Scenario']) == {'working'}
+
+
+def test_every_range_failing(source, cache):
+    results = run_scenarios([Scenario(source.tickers, 'HRP', start_date='2022-01-03', end_date='2024-12-31')],
+                            n_jobs=2, cache=cache)
+    assert len(results.errors) == 1
+    assert results.weights.empty
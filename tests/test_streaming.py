@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from asset_info import fetch_asset_info
+from data_cache import PriceCache
+from data_gathering import Portfolio, RELEVANT_INFO, STREAM_STEPS, process_chunks
+from streaming import stream_prices
+from yf_data_gathering import gather_data
+from benchmarks.synthetic import SyntheticSource, canned_info
+
+
+START, END = '2024-01-01', '2024-06-01'
+
+
+class FlakySource(SyntheticSource):
+    """
+    Synthetic source behaving like yfinance on errors. Tickers in empty return NaN columns for their next
+    attempts (the given number of them), a download with a ticker in raising raises.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = []
+        self.empty = {}
+        self.raising = set()
+
+    def download(self, tickers, start, end, interval):
+        self.requests.append(list(tickers))
+        if self.raising & set(tickers):
+            raise ConnectionError('Yahoo unavailable')
+        data = super().download(tickers, start, end, interval)
+        for ticker in tickers:
+            if self.empty.get(ticker, 0):
+                self.empty[ticker] -= 1
+                data.loc[:, (slice(None), ticker)] = np.nan
+        return data
+
+
+@pytest.fixture
+def source():
+    return FlakySource(7, 1, seed=4, end='2024-06-28')
+
+
+@pytest.fixture
+def cache(tmp_path, source):
+    return PriceCache(str(tmp_path), source=source)
+
+
+def stream(source, cache, **kwargs):
+    return list(stream_prices(source.tickers, START, END, chunk_size=3, max_workers=2, backoff=0.01, cache=cache,
+                              **kwargs))
+
+
+def expected(source, tickers):
+    data = source.panel.loc[START:'2024-05-31', (slice(None), tickers)]
+    data.index = data.index.as_unit('ns')
+    return data
+
+
+def test_chunks_are_yielded_in_order(source, cache):
+    chunks = stream(source, cache)
+    assert [chunk.number for chunk in chunks] == [0, 1, 2]
+    assert [chunk.tickers for chunk in chunks] == [source.tickers[:3], source.tickers[3:6], source.tickers[6:]]
+    for chunk in chunks:
+        assert not chunk.failed and chunk.failures == {}
+        pd.testing.assert_frame_equal(chunk.data, expected(source, chunk.tickers), check_freq=False)
+
+
+def test_ticker_without_bars_is_retried(source, cache):
+    ticker = source.tickers[1]
+    source.empty = {ticker: 1}
+    chunk = stream(source, cache)[0]
+
+    # The retry asks only for the empty ticker, although the cache remembers its empty answer
+    assert [tickers for tickers in source.requests if ticker in tickers] == [source.tickers[:3], [ticker]]
+    assert chunk.failures == {}
+    pd.testing.assert_frame_equal(chunk.data, expected(source, chunk.tickers), check_freq=False)
+
+
+def test_ticker_without_bars_after_retries_is_reported(source, cache):
+    ticker = source.tickers[1]
+    source.empty = {ticker: 10}
+    chunk = stream(source, cache, retries=2)[0]
+
+    assert sum(ticker in tickers for tickers in source.requests) == 3
+    assert not chunk.failed
+    assert chunk.failures == {ticker: 'No data returned'}
+    assert ticker not in chunk.data.columns.get_level_values(1)
+    others = [source.tickers[0], source.tickers[2]]
+    pd.testing.assert_frame_equal(chunk.data, expected(source, others), check_freq=False)
+
+
+def test_failing_chunk_does_not_stop_the_rest(source, cache):
+    source.raising = {source.tickers[4]}
+    chunks = stream(source, cache, retries=1)
+
+    assert chunks[1].failed
+    assert 'ConnectionError' in chunks[1].error
+    assert chunks[1].failures == dict.fromkeys(source.tickers[3:6], chunks[1].error)
+    assert not chunks[0].failed and not chunks[2].failed
+
+
+def test_process_chunks_matches_whole_download(source, cache):
+    source.empty = {source.tickers[5]: 10}
+    result = process_chunks(stream(source, cache))
+    assert list(result.failures) == [source.tickers[5]]
+
+    whole = expected(source, [ticker for ticker in source.tickers if ticker != source.tickers[5]])
+    for step, (function, axis) in STREAM_STEPS.items():
+        table = result.tables[step]
+        reference = function(whole)
+        if axis == 1:
+            table = table[reference.columns]
+        else:
+            table = table.sort_values('Ticker', kind='stable') if 'Ticker' in table.columns else table.sort_index()
+            reference = reference.sort_values('Ticker', kind='stable') if 'Ticker' in reference.columns \
+                else reference.sort_index()
+        pd.testing.assert_frame_equal(table, reference, check_freq=False, check_like=True)
+
+
+def test_process_chunks_rejects_unknown_steps(source, cache):
+    with pytest.raises(ValueError):
+        process_chunks(stream(source, cache), steps=('returns', 'unknown'))
+
+
+def test_failures_are_reported_by_gather_data_and_portfolio(source, cache):
+    fetch_asset_info(source.tickers, RELEVANT_INFO, fetcher=canned_info)
+    ticker = source.tickers[3]
+    source.empty = {ticker: 100}
+
+    data = gather_data(source.tickers, START, END, cache=cache, chunk_size=3)
+    assert list(data.attrs['failures']) == [ticker]
+    assert ticker not in data.columns
+
+    pft = Portfolio(source.tickers, start_date=START, end_date=END, cache=cache, chunk_size=3)
+    assert ticker not in pft.historical_data.columns
+    assert list(pft.download_failures) == [ticker]
@@ -0,0 +1,101 @@
+import os
+
+from typing import Dict, List
+
+
+def read_tickers(path: str) -> List[str]:
+    """
+    Reads tickers from a text file with one ticker per line (the format of wig20.txt and of the app's file upload).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f.read().splitlines() if line.strip()]
+
+
+# Constituents of the predefined groups of tickers in Yahoo Finance notation (at the end of 2025). Index memberships
+# change every quarter, so the lists should be revised from time to time and the snapshots rebuilt.
+
+SP500 = [
+    "MMM", "AOS", "ABT", "ABBV", "ACN", "ADBE", "AMD", "AES", "AFL", "A",
+    "APD", "ABNB", "AKAM", "ALB", "ARE", "ALGN", "ALLE", "LNT", "ALL", "GOOGL",
+    "GOOG", "MO", "AMZN", "AMCR", "AEE", "AEP", "AXP", "AIG", "AMT", "AWK",
+    "AMP", "AME", "AMGN", "APH", "ADI", "AON", "APA", "APO", "AAPL", "AMAT",
+    "APTV", "ACGL", "ADM", "ANET", "AJG", "AIZ", "T", "ATO", "ADSK", "ADP",
+    "AZO", "AVB", "AVY", "AXON", "BKR", "BALL", "BAC", "BAX", "BDX", "BRK-B",
+    "BBY", "TECH", "BIIB", "BLK", "BX", "BK", "BA", "BKNG", "BSX", "BMY",
+    "AVGO", "BR", "BRO", "BF-B", "BLDR", "BG", "BXP", "CHRW", "CDNS", "CZR",
+    "CPT", "CPB", "COF", "CAH", "KMX", "CCL", "CARR", "CAT", "CBOE", "CBRE",
+    "CDW", "COR", "CNC", "CNP", "CF", "CRL", "SCHW", "CHTR", "CVX", "CMG",
+    "CB", "CHD", "CI", "CINF", "CTAS", "CSCO", "C", "CFG", "CLX", "CME",
+    "CMS", "KO", "CTSH", "CL", "CMCSA", "CAG", "COP", "ED", "STZ", "CEG",
+    "COO", "CPRT", "GLW", "CPAY", "CTVA", "CSGP", "COST", "CTRA", "CRWD", "CCI",
+    "CSX", "CMI", "CVS", "DHR", "DRI", "DVA", "DAY", "DECK", "DE", "DELL",
+    "DAL", "DVN", "DXCM", "FANG", "DLR", "DG", "DLTR", "D", "DPZ", "DASH",
+    "DOV", "DOW", "DHI", "DTE", "DUK", "DD", "EMN", "ETN", "EBAY", "ECL",
+    "EIX", "EW", "EA", "ELV", "EMR", "ENPH", "ETR", "EOG", "EPAM", "EQT",
+    "EFX", "EQIX", "EQR", "ERIE", "ESS", "EL", "EG", "EVRG", "ES", "EXC",
+    "EXE", "EXPE", "EXPD", "EXR", "XOM", "FFIV", "FDS", "FICO", "FAST", "FRT",
+    "FDX", "FIS", "FITB", "FSLR", "FE", "FI", "F", "FTNT", "FTV", "FOXA",
+    "FOX", "BEN", "FCX", "GRMN", "IT", "GE", "GEHC", "GEV", "GEN", "GNRC",
+    "GD", "GIS", "GM", "GPC", "GILD", "GPN", "GL", "GDDY", "GS", "HAL",
+    "HIG", "HAS", "HCA", "DOC", "HSIC", "HSY", "HPE", "HLT", "HOLX", "HD",
+    "HON", "HRL", "HST", "HWM", "HPQ", "HUBB", "HUM", "HBAN", "HII", "IBM",
+    "IEX", "IDXX", "ITW", "INCY", "IR", "PODD", "INTC", "ICE", "IFF", "IP",
+    "IPG", "INTU", "ISRG", "IVZ", "INVH", "IQV", "IRM", "JBHT", "JBL", "JKHY",
+    "J", "JNJ", "JCI", "JPM", "K", "KVUE", "KDP", "KEY", "KEYS", "KMB",
+    "KIM", "KMI", "KKR", "KLAC", "KHC", "KR", "LHX", "LH", "LRCX", "LW",
+    "LVS", "LDOS", "LEN", "LII", "LLY", "LIN", "LYV", "LKQ", "LMT", "L",
+    "LOW", "LULU", "LYB", "MTB", "MPC", "MKTX", "MAR", "MMC", "MLM", "MAS",
+    "MA", "MTCH", "MKC", "MCD", "MCK", "MDT", "MRK", "META", "MET", "MTD",
+    "MGM", "MCHP", "MU", "MSFT", "MAA", "MRNA", "MHK", "MOH", "TAP", "MDLZ",
+    "MPWR", "MNST", "MCO", "MS", "MOS", "MSI", "MSCI", "NDAQ", "NTAP", "NFLX",
+    "NEM", "NWSA", "NWS", "NEE", "NKE", "NI", "NDSN", "NSC", "NTRS", "NOC",
+    "NCLH", "NRG", "NUE", "NVDA", "NVR", "NXPI", "ORLY", "OXY", "ODFL", "OMC",
+    "ON", "OKE", "ORCL", "OTIS", "PCAR", "PKG", "PLTR", "PANW", "PH", "PAYX",
+    "PAYC", "PYPL", "PNR", "PEP", "PFE", "PCG", "PM", "PSX", "PNW", "PNC",
+    "POOL", "PPG", "PPL", "PFG", "PG", "PGR", "PLD", "PRU", "PEG", "PTC",
+    "PSA", "PHM", "PWR", "QCOM", "DGX", "RL", "RJF", "RTX", "O", "REG",
+    "REGN", "RF", "RSG", "RMD", "RVTY", "ROK", "ROL", "ROP", "ROST", "RCL",
+    "SPGI", "CRM", "SBAC", "SLB", "STX", "SRE", "NOW", "SHW", "SPG", "SWKS",
+    "SJM", "SW", "SNA", "SOLV", "SO", "LUV", "SWK", "SBUX", "STT", "STLD",
+    "STE", "SYK", "SMCI", "SYF", "SNPS", "SYY", "TMUS", "TROW", "TTWO", "TPR",
+    "TRGP", "TGT", "TEL", "TDY", "TER", "TSLA", "TXN", "TPL", "TXT", "TMO",
+    "TJX", "TKO", "TSCO", "TT", "TDG", "TRV", "TRMB", "TFC", "TYL", "TSN",
+    "USB", "UBER", "UDR", "ULTA", "UNP", "UAL", "UPS", "URI", "UNH", "UHS",
+    "VLO", "VTR", "VLTO", "VRSN", "VRSK", "VZ", "VRTX", "VTRS", "VICI", "V",
+    "VST", "VMC", "WRB", "GWW", "WAB", "WMT", "DIS", "WBD", "WM", "WAT",
+    "WEC", "WFC", "WELL", "WST", "WDC", "WY", "WSM", "WMB", "WTW", "WDAY",
+    "WYNN", "XEL", "XYL", "YUM", "ZBRA", "ZBH", "ZTS"
+]
+
+FTSE100 = [
+    "AAF.L", "AAL.L", "ABF.L", "ADM.L", "AHT.L", "ANTO.L", "AUTO.L", "AV.L", "AZN.L", "BA.L",
+    "BARC.L", "BATS.L", "BEZ.L", "BKG.L", "BNZL.L", "BP.L", "BT-A.L", "BTRW.L", "CCH.L", "CNA.L",
+    "CPG.L", "CRDA.L", "CTEC.L", "DCC.L", "DGE.L", "DPLM.L", "EDV.L", "ENT.L", "EXPN.L", "EZJ.L",
+    "FCIT.L", "FRES.L", "GAW.L", "GLEN.L", "GSK.L", "HIK.L", "HLMA.L", "HLN.L", "HSBA.L", "HSX.L",
+    "HWDN.L", "IAG.L", "ICG.L", "IHG.L", "III.L", "IMB.L", "IMI.L", "INF.L", "ITRK.L", "JD.L",
+    "KGF.L", "LAND.L", "LGEN.L", "LLOY.L", "LMP.L", "LSEG.L", "MKS.L", "MNDI.L", "MNG.L", "MRO.L",
+    "NG.L", "NWG.L", "NXT.L", "PCT.L", "PHNX.L", "PRU.L", "PSH.L", "PSN.L", "PSON.L", "REL.L",
+    "RIO.L", "RKT.L", "RMV.L", "RR.L", "RTO.L", "SBRY.L", "SDR.L", "SGE.L", "SGRO.L", "SHEL.L",
+    "SMIN.L", "SMT.L", "SN.L", "SPX.L", "SSE.L", "STAN.L", "STJ.L", "SVT.L", "TSCO.L", "TW.L",
+    "ULVR.L", "UTG.L", "UU.L", "VOD.L", "WEIR.L", "WPP.L", "WTB.L", "ALW.L", "BAB.L", "IGG.L"
+]
+
+# Kept in a ticker file, which can also be uploaded in the app
+WIG20 = read_tickers(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wig20.txt'))
+
+UNIVERSES: Dict[str, List[str]] = {
+    'SP500': SP500,
+    'WIG20': WIG20,
+    'FTSE100': FTSE100
+}
+
+
+def get_universe(name: str) -> List[str]:
+    """
+    Returns the tickers of a predefined universe, or of a ticker file if name is a path to one.
+    """
+    if name in UNIVERSES:
+        return list(UNIVERSES[name])
+    if os.path.isfile(name):
+        return read_tickers(name)
+    raise ValueError(f"Unknown universe: {name}, expected one of {list(UNIVERSES)} or a path to a ticker file")
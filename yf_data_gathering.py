@@ -1,25 +1,40 @@
 import pandas as pd
-import yfinance as yf
 import os
 
 from typing import List, Optional
 
+from data_cache import PriceCache, get_default_cache
+from streaming import stream_prices
+from universes import UNIVERSES
+
 PERIODS = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '3y', '5y']
 
-GROUPS_OF_TICKERS = {
-    'SP500': [],
-    'WIG20': [],
-    'FTSE100': []
-}
+GROUPS_OF_TICKERS = UNIVERSES
 
 def gather_data(tickers: List[str], 
                 start_date: Optional[str] = None, 
                 end_date: Optional[str] = None, 
-                period: str = '1y'):
+                period: str = '1y',
+                cache: Optional[PriceCache] = None,
+                chunk_size: Optional[int] = None):
+    # Reading through the on-disk cache, only bars that are not cached yet are downloaded from Yahoo
+    cache = cache if cache is not None else get_default_cache()
+    if chunk_size:
+        # Large universes are streamed in chunks and only Close prices of every chunk are kept,
+        # tickers which could not be downloaded are missing from the columns and listed in data.attrs['failures']
+        closes, failures = [], {}
+        for chunk in stream_prices(tickers, start_date, end_date, period, chunk_size=chunk_size, cache=cache):
+            failures.update(chunk.failures)
+            if not chunk.failed:
+                closes.append(chunk.data['Close'])
+        data = pd.concat(closes, axis=1) if closes else pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+        data.index.name = 'Date'
+        data.attrs['failures'] = failures
+        return data.sort_index(ascending=False)
     if start_date and end_date:
-        data = yf.download(tickers, group_by= "column", start= start_date, end= end_date)
+        data = cache.get(tickers, start_date= start_date, end_date= end_date)
     else:
-        data = yf.download(tickers, group_by= "column", period= period)
+        data = cache.get(tickers, period= period)
     if isinstance(data, pd.Series):
         data = data.to_frame(name=tickers[0])      
     data = data['Close']